@@ -0,0 +1,111 @@
+"""Import time and time-to-first-command, headless vs. the terminal UI.
+
+Each measurement runs in a fresh interpreter. Results are printed as JSON.
+
+    python benchmarks/startup.py [--runs N]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+IMPORT_SCRIPT = """
+import atexit, sys, time
+t0 = time.perf_counter()
+from weallcode_robot import Robot
+robot = Robot("beep", headless={headless})
+# the UI is built on first use, as it is when the program runs at exit
+robot.ui
+t1 = time.perf_counter()
+atexit.unregister(robot._at_exit)
+print(t1 - t0, len(sys.modules), "textual" in sys.modules)
+"""
+
+# the connection is replaced by an in-process transport so only library
+# start-up is measured, not BLE scanning
+FIRST_COMMAND_SCRIPT = """
+import atexit, time
+t0 = time.perf_counter()
+from weallcode_robot import Robot
+from weallcode_robot.connection import RobotConnection
+from weallcode_robot.executor import ProgramExecutor
+
+class FirstWrite:
+    at = None
+    async def write(self, char_uuid, payload):
+        if FirstWrite.at is None:
+            FirstWrite.at = time.perf_counter()
+        return True
+
+class Client:
+    async def disconnect(self):
+        pass
+
+async def connect(self, timeout=10.0, device=None):
+    self.client = Client()
+    self.executor = ProgramExecutor(FirstWrite())
+
+RobotConnection.connect = connect
+
+robot = Robot("beep", headless=True)
+atexit.unregister(robot._at_exit)
+robot.led(255, 0, 0)
+robot.run_headless()
+print(FirstWrite.at - t0)
+"""
+
+
+def measure(script: str, runs: int) -> list[list[str]]:
+    env = dict(os.environ, PYTHONPATH=str(ROOT), WEALLCODE_HEADLESS="")
+    results = []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", script],
+            env=env,
+            cwd=tempfile.gettempdir(),
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        results.append(out.stdout.split())
+    return results
+
+
+def summarize(values: list[float]) -> dict:
+    return {
+        "median_ms": statistics.median(values) * 1000,
+        "min_ms": min(values) * 1000,
+        "max_ms": max(values) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    report = {"python": sys.version.split()[0], "runs": args.runs}
+
+    for mode, headless in (("ui", False), ("headless", True)):
+        rows = measure(IMPORT_SCRIPT.format(headless=headless), args.runs)
+        report[f"import_{mode}"] = {
+            **summarize([float(row[0]) for row in rows]),
+            "modules": int(rows[-1][1]),
+            "textual_imported": rows[-1][2] == "True",
+        }
+
+    rows = measure(FIRST_COMMAND_SCRIPT, args.runs)
+    report["first_command_headless"] = summarize([float(row[0]) for row in rows])
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
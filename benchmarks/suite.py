@@ -0,0 +1,395 @@
+"""Throughput, scheduling and latency benchmarks against the simulator.
+
+Runs on any machine, no robot needed. Results are printed as JSON so they
+can be stored and compared between releases.
+
+    python benchmarks/suite.py [--quick] [--output results.json]
+"""
+
+import argparse
+import asyncio
+import atexit
+import copy
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from weallcode_robot import __version__, program_file
+from weallcode_robot.commands import CommandQueue
+from weallcode_robot.connection import RobotConnection
+from weallcode_robot.fleet import Fleet
+from weallcode_robot.headless import run_robot
+from weallcode_robot.robot import Robot
+from weallcode_robot.simulator import Simulator
+from weallcode_robot.utils import (
+    buzzer_characteristic_uuid,
+    display_characteristic_uuid,
+    led_characteristic_uuid,
+    motor_characteristic_uuid,
+)
+
+
+def _stats(values: list[float]) -> dict:
+    return {
+        "mean_ms": statistics.fmean(values) * 1000,
+        "p50_ms": statistics.median(values) * 1000,
+        "p99_ms": sorted(values)[int(len(values) * 0.99) - 1] * 1000,
+        "max_ms": max(values) * 1000,
+    }
+
+
+class _LegacyCommand:
+    """A command as 3.0 built it: a mutable object with its UUIDs and values."""
+
+    def __init__(self, char_uuid: str | None, **values):
+        if char_uuid is not None:  # waits have no characteristic
+            self._service_uuid = char_uuid[:7] + "1" + char_uuid[8:]
+            self._char_uuid = char_uuid
+        self.__dict__.update(values)
+
+
+class _LegacyQueue:
+    """3.0's command queue, frozen here so the old press path can still be timed."""
+
+    def __init__(self, name: str, maxsize: int = 100):
+        self.name = name
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self._queue = None
+
+    def put(self, command):
+        if not self.queue.full():
+            self.queue.put_nowait(command)
+
+    def clear(self):
+        self.put(_LegacyCommand(display_characteristic_uuid, matrix=[0] * 25))
+        self.put(
+            _LegacyCommand(
+                motor_characteristic_uuid,
+                left_fwd=0,
+                left_rev=0,
+                right_fwd=0,
+                right_rev=0,
+            )
+        )
+        self.put(_LegacyCommand(led_characteristic_uuid, red=0, green=0, blue=0))
+        self.put(_LegacyCommand(buzzer_characteristic_uuid, frequency=0))
+        return self
+
+    def clearDisplay(self):
+        self.put(_LegacyCommand(display_characteristic_uuid, matrix=[0] * 25))
+        return self
+
+    def led(self, red, green, blue, duration: float = 0):
+        self.put(
+            _LegacyCommand(led_characteristic_uuid, red=red, green=green, blue=blue)
+        )
+        return self.wait(duration)
+
+    def move(self, left, right, duration: float = 0):
+        self.put(
+            _LegacyCommand(
+                motor_characteristic_uuid,
+                left_fwd=max(left, 0),
+                left_rev=max(-left, 0),
+                right_fwd=max(right, 0),
+                right_rev=max(-right, 0),
+            )
+        )
+        return self.wait(duration)
+
+    def wait(self, duration: float):
+        if duration > 0:
+            self.put(_LegacyCommand(None, duration=duration))
+        return self
+
+
+async def _connect(simulator: Simulator, name: str, **kwargs) -> RobotConnection:
+    connection = RobotConnection(name, backend=simulator, **kwargs)
+    await connection.connect(timeout=1.0)
+    return connection
+
+
+async def bench_throughput(steps: int) -> dict:
+    """Writes per second through the executor for different links."""
+    results = {}
+    links = {
+        "overhead": dict(latency=0.0, packet_interval=0.0),
+        "acknowledged": dict(latency=0.015, packet_interval=0.0075),
+        "streaming": dict(latency=0.015, packet_interval=0.0075),
+    }
+    for label, link in links.items():
+        simulator = Simulator(**link)
+        simulator.add_robot("beep")
+        connection = await _connect(simulator, "beep", streaming=label == "streaming")
+
+        commands = CommandQueue("throughput")
+        count = steps if label == "overhead" else steps // 10
+        for i in range(count):
+            commands.move(i % 100, -(i % 100))
+        # every step needs a wait or the optimizer would merge them away
+        program = tuple(step._replace(delay=1e-9) for step in commands.compile())
+
+        start = time.perf_counter()
+        await connection.run(program)
+        elapsed = time.perf_counter() - start
+
+        robot = simulator["beep"]
+        results[label] = {
+            "writes": len(robot.writes),
+            "dropped": sum(write.dropped for write in robot.writes),
+            "writes_per_second": len(robot.writes) / elapsed,
+        }
+        await connection.disconnect()
+    return results
+
+
+async def bench_stages(frames: int) -> dict:
+    """LED, motor and display updates per frame, one by one vs. concurrently."""
+    results = {}
+    for streaming in (False, True):
+        for concurrent in (False, True):
+            simulator = Simulator(latency=0.01, packet_interval=0.0075)
+            simulator.add_robot("beep")
+            connection = await _connect(simulator, "beep", streaming=streaming)
+            connection.executor.concurrent = concurrent
+
+            commands = CommandQueue("stages")
+            for i in range(frames):
+                commands.led(i % 256, 0, 0).move(i % 100, 0).displayText(str(i % 10))
+                commands.wait(0.001)
+
+            start = time.perf_counter()
+            await connection.run(commands.compile())
+            elapsed = time.perf_counter() - start
+
+            label = ("streaming" if streaming else "acknowledged") + (
+                "_concurrent" if concurrent else "_sequential"
+            )
+            results[label] = {"frames_per_second": frames / elapsed}
+            await connection.disconnect()
+    return results
+
+
+async def bench_timeline(steps: int, interval: float) -> dict:
+    """Jitter and drift of a wait-driven animation, sleep-based vs. timeline."""
+    results = {}
+    for label, timeline in (("sleep", False), ("timeline", True)):
+        simulator = Simulator(latency=0.01, jitter=0.01, packet_interval=0.0, seed=1)
+        simulator.add_robot("beep")
+        connection = await _connect(simulator, "beep", timeline=timeline)
+
+        commands = CommandQueue("timeline")
+        for i in range(steps):
+            commands.led(i % 256, 0, 0, interval)
+        program = commands.compile()
+
+        start = time.monotonic()
+        await connection.run(program)
+
+        writes = simulator["beep"].writes
+        errors = [
+            write.timestamp - (start + i * interval) for i, write in enumerate(writes)
+        ]
+        intervals = [b.timestamp - a.timestamp for a, b in zip(writes, writes[1:])]
+        results[label] = {
+            "drift_ms": errors[-1] * 1000,
+            "interval_jitter_ms": statistics.pstdev(intervals) * 1000,
+        }
+        await connection.disconnect()
+    return results
+
+
+async def bench_event_latency(presses: int) -> dict:
+    """Time from a button notification to the first write it causes."""
+    simulator = Simulator(latency=0.0, packet_interval=0.0)
+    robot = simulator.add_robot("beep")
+
+    script = Robot("beep", headless=True, backend=simulator)
+    atexit.unregister(script._at_exit)
+    for i in range(10):
+        script.buttonA.led(i, i, i, 0.0001)
+
+    task = asyncio.create_task(run_robot(script))
+    while not robot.clients:
+        await asyncio.sleep(0.001)
+    await asyncio.sleep(0.05)
+
+    latencies = []
+    for _ in range(presses):
+        before = len(robot.writes)
+        pressed = time.monotonic()
+        robot.press_button(1)
+        while len(robot.writes) == before:
+            await asyncio.sleep(0)
+        latencies.append(robot.writes[before].timestamp - pressed)
+        await asyncio.sleep(0.005)
+
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+    # what every key press paid in 3.0 before reaching the robot: a deep copy
+    # of the handler's queue of mutable commands, with the clear appended
+    legacy = _LegacyQueue("beep button a")
+    for i in range(10):
+        legacy.put(_LegacyCommand(led_characteristic_uuid, red=i, green=i, blue=i))
+        legacy.put(_LegacyCommand(None, duration=0.0001))
+    deepcopies = []
+    for _ in range(presses):
+        start = time.perf_counter()
+        copy.deepcopy(legacy).clear().clearDisplay()
+        deepcopies.append(time.perf_counter() - start)
+
+    return {"compiled": _stats(latencies), "legacy_deepcopy": _stats(deepcopies)}
+
+
+def bench_memory(commands: int) -> dict:
+    """Bytes allocated per queued command and per compiled step.
+
+    ``repeated`` reuses a few values, like most hand-written programs;
+    ``unique`` gives every command a different value so none can be shared.
+    ``bytes_per_legacy_queued_command`` queues the same program as 3.0 did, one
+    mutable command object each, without its cap of 100 commands.
+    """
+
+    def fill(queue, label):
+        for i in range(commands):
+            if label == "repeated":
+                queue.led(i % 4 * 64, 0, 0).move(100, 100, 0.5).clear()
+            else:
+                queue.led(i % 256, i // 256 % 256, 0).move(i % 100, -(i % 100), 0.01)
+
+    results = {}
+    for label in ("repeated", "unique"):
+        tracemalloc.start()
+
+        before = tracemalloc.get_traced_memory()[0]
+        legacy = _LegacyQueue("memory", maxsize=0)
+        fill(legacy, label)
+        legacy_queued = tracemalloc.get_traced_memory()[0] - before
+        legacy_size = legacy.queue.qsize()
+        del legacy
+
+        before = tracemalloc.get_traced_memory()[0]
+        queue = CommandQueue("memory")
+        fill(queue, label)
+        queued = tracemalloc.get_traced_memory()[0] - before
+
+        before = tracemalloc.get_traced_memory()[0]
+        program = queue.compile()
+        compiled = tracemalloc.get_traced_memory()[0] - before
+
+        tracemalloc.stop()
+        results[label] = {
+            "bytes_per_queued_command": queued / len(queue.queue),
+            "bytes_per_legacy_queued_command": legacy_queued / legacy_size,
+            "bytes_per_compiled_step": compiled / len(program),
+        }
+        del program, queue
+    return results
+
+
+def bench_snapshot(sizes: list[int], rounds: int = 1000) -> dict:
+    """Cost of saving and restoring a queue, which shouldn't grow with its size."""
+    results = {}
+    for size in sizes:
+        queue = CommandQueue("snapshot")
+        for i in range(size):
+            queue.led(i % 256, 0, 0)
+
+        start = time.perf_counter()
+        for _ in range(rounds):
+            queue.save_sync()
+            queue.restore_sync()
+        results[size] = {
+            "save_restore_us": (time.perf_counter() - start) / rounds * 1e6
+        }
+    return results
+
+
+def bench_program_file(commands: int) -> dict:
+    """Building a program in Python vs. loading it from a packed file."""
+    start = time.perf_counter()
+    queue = CommandQueue("choreography")
+    for i in range(commands):
+        queue.led(i % 256, 0, 0).move(i % 100, -(i % 100), 0.01)
+    program = queue.compile()
+    built = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "choreography.wacp"
+        program_file.dump(program, path)
+        size = path.stat().st_size
+
+        start = time.perf_counter()
+        program_file.load(path)
+        loaded = time.perf_counter() - start
+
+    return {
+        "build_ms": built * 1000,
+        "load_ms": loaded * 1000,
+        "bytes_per_step": size / len(program),
+    }
+
+
+async def bench_fleet(sizes: list[int], steps: int) -> dict:
+    """Wall time to connect to and run the same program on N robots."""
+    results = {}
+    for size in sizes:
+        simulator = Simulator(latency=0.01, packet_interval=0.0075)
+        names = [f"robot-{i}" for i in range(size)]
+        for name in names:
+            simulator.add_robot(name)
+
+        fleet = Fleet(names, max_connecting=8, backend=simulator, scan_timeout=1.0)
+        for robot in fleet:
+            for i in range(steps):
+                robot.led(i % 256, 0, 0, 0.01)
+
+        start = time.perf_counter()
+        await fleet.run_async()
+        elapsed = time.perf_counter() - start
+
+        writes = sum(len(robot.writes) for robot in simulator.robots.values())
+        results[str(size)] = {
+            "seconds": elapsed,
+            "failed": sum(member.error is not None for member in fleet),
+            "writes_per_second": writes / elapsed,
+        }
+    return results
+
+
+async def main(quick: bool) -> dict:
+    scale = 1 if quick else 10
+    return {
+        "version": __version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "throughput": await bench_throughput(1000 * scale),
+        "stages": await bench_stages(20 * scale),
+        "timeline": await bench_timeline(20 * scale, 0.02),
+        "event_latency": await bench_event_latency(20 * scale),
+        "memory": bench_memory(1000 * scale),
+        "snapshot": bench_snapshot([10, 1000, 100000]),
+        "program_file": bench_program_file(1000 * scale),
+        "fleet": await bench_fleet([1, 5, 10, 20, 50], 5 * scale),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--quick", action="store_true", help="smaller workloads")
+    parser.add_argument("--output", help="also write the results to this file")
+    args = parser.parse_args()
+
+    results = asyncio.run(main(args.quick))
+    report = json.dumps(results, indent=2)
+    print(report)
+    if args.output:
+        Path(args.output).write_text(report + "\n")
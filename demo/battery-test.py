@@ -1,15 +1,28 @@
+import asyncio
 from datetime import datetime
 
-from weallcode_robot import Robot
+from weallcode_robot import CommandQueue, RobotDaemon
+from weallcode_robot.utils import buttons_characteristic_uuid
 
-robot = Robot("boop")
 
-while True:
-    robot.move(-100, 100)
-    robot.led(255, 255, 255)
-    robot.wait(1)
+async def main():
+    # the daemon keeps the robot connected between runs and reconnects if
+    # the link drops
+    async with RobotDaemon("boop") as robot:
+        # press a button now and then to check the robot is still responsive
+        await robot.subscribe(buttons_characteristic_uuid)
+        buttons = robot.telemetry().buffer(buttons_characteristic_uuid)
 
-    # print date and time
-    print(datetime.now().strftime("%H:%M:%S"))
+        while True:
+            commands = CommandQueue("battery test")
+            commands.move(-100, 100)
+            commands.led(255, 255, 255)
+            commands.wait(1)
 
-    robot.run(False)
+            await robot.submit(commands, clear=False)
+
+            # print date and time, and how many button presses were seen
+            print(datetime.now().strftime("%H:%M:%S"), f"{buttons.count} presses")
+
+
+asyncio.run(main())
@@ -1,9 +1,9 @@
-import threading
+from concurrent.futures import ThreadPoolExecutor
 
 from weallcode_robot import Robot
 
 
-def run_robot(robot):
+def program_robot(robot):
     robot.displayText(robot.name, 3)
     robot.displayDots(
         # fmt: off
@@ -34,27 +34,28 @@ def run_robot(robot):
     robot.led(0, 255, 0, 0.25)
     robot.led(0, 0, 255, 0.25)
     for x in (-100, -80, -60, 60, 80, 100):
-        print(x)
         robot.move(x, -x, 0.25)
         robot.stop()
         robot.wait(0.25)
-    robot.run()
 
+    # returns straight away; the robot runs on the library's background loop
+    return robot.run()
 
-robots = [
-    Robot("chirp"),
-    Robot("buzz"),
-    Robot("boop"),
-    Robot("bzzt"),
-    Robot("click"),
-]
 
-threads = []
-for robot in robots:
-    thread = threading.Thread(target=run_robot, args=(robot,))
-    thread.start()
-    threads.append(thread)
+robots = [Robot(name) for name in ["chirp", "buzz", "boop", "bzzt", "click"]]
+
+# program each robot from its own thread; robots that aren't in the address
+# cache are found in one shared scan, then all of them run side by side
+with ThreadPoolExecutor() as pool:
+    programmed = {
+        robot.display_name: pool.submit(program_robot, robot) for robot in robots
+    }
+runs = {name: future.result() for name, future in programmed.items()}
 
-# Wait for all threads to complete
-for thread in threads:
-    thread.join()
+for robot in robots:
+    try:
+        robot.close()
+        result = runs[robot.display_name].result()
+        print(f"{robot.display_name}: {result.steps} steps in {result.elapsed:.2f} s")
+    except Exception as e:
+        print(f"{robot.display_name}: failed ({e})")
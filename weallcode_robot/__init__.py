@@ -1,11 +1,38 @@
 __version__ = "3.0.2"
 
+import importlib
 import logging
+from typing import TYPE_CHECKING
 
-from .robot import Robot as Robot
+# public names are imported on first use so that scripts only pay for the
+# parts of the library (textual, bleak) they actually touch
+_exports = {
+    "CommandQueue": ".commands",
+    "DisconnectPolicy": ".utils",
+    "EventPolicy": ".utils",
+    "Fleet": ".fleet",
+    "Robot": ".robot",
+    "RobotDaemon": ".daemon",
+}
 
-logging.basicConfig(
-    filename="wac.log",
-    encoding="utf-8",
-    level=logging.DEBUG,
-)
+__all__ = list(_exports)
+
+if TYPE_CHECKING:
+    from .commands import CommandQueue as CommandQueue
+    from .daemon import RobotDaemon as RobotDaemon
+    from .fleet import Fleet as Fleet
+    from .robot import Robot as Robot
+    from .utils import DisconnectPolicy as DisconnectPolicy
+    from .utils import EventPolicy as EventPolicy
+
+
+def __getattr__(name):
+    if name in _exports:
+        value = getattr(importlib.import_module(_exports[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# libraries should not configure logging; see weallcode_robot.log.enable_logging
+logging.getLogger(__name__).addHandler(logging.NullHandler())
@@ -0,0 +1,48 @@
+import logging
+
+from bleak import BleakClient
+from bleak.backends.characteristic import BleakGATTCharacteristic
+
+from .utils import command_characteristics
+
+logger = logging.getLogger(__name__)
+
+
+class MissingCharacteristicError(Exception):
+    pass
+
+
+class CharacteristicRegistry:
+    """GATT characteristics resolved once per connection."""
+
+    def __init__(self, client: BleakClient):
+        self.client = client
+        self._characteristics = {}
+
+    @classmethod
+    def build(cls, client: BleakClient, characteristics=command_characteristics):
+        registry = cls(client)
+        for service_uuid, char_uuid in characteristics:
+            registry.resolve(service_uuid, char_uuid)
+        return registry
+
+    def resolve(self, service_uuid: str, char_uuid: str) -> BleakGATTCharacteristic:
+        service = self.client.services.get_service(service_uuid)
+        if service is None:
+            raise MissingCharacteristicError(f"service {service_uuid} not found")
+
+        char = service.get_characteristic(char_uuid)
+        if char is None:
+            raise MissingCharacteristicError(
+                f"characteristic {char_uuid} not found in service {service_uuid}"
+            )
+
+        logger.debug("resolved service: %s, char: %s", service, char)
+        self._characteristics[char_uuid] = char
+        return char
+
+    def __getitem__(self, char_uuid: str) -> BleakGATTCharacteristic:
+        return self._characteristics[char_uuid]
+
+    def __contains__(self, char_uuid: str) -> bool:
+        return char_uuid in self._characteristics
@@ -1,28 +1,158 @@
 import asyncio
 import logging
-from queue import Queue
+from collections import deque
+from typing import NamedTuple
+
+from .utils import (
+    buzzer_characteristic_uuid,
+    buzzer_service_uuid,
+    display_characteristic_uuid,
+    display_service_uuid,
+    led_characteristic_uuid,
+    led_service_uuid,
+    motor_characteristic_uuid,
+    motor_service_uuid,
+    PersistentQueue,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class ProgramStep(NamedTuple):
+    char_uuid: str | None  # None for a step that only waits
+    payload: bytes
+    delay: float  # seconds to wait after the write
+
+
+def idempotent(char_uuid: str, payload: bytes) -> bool:
+    """Whether writing payload a second time leaves the robot unchanged."""
+    # text scrolls across the display again on every write, everything else
+    # just sets a value
+    return not (char_uuid == display_characteristic_uuid and payload[:1] == b"\x01")
+
+
+class CommandStream:
+    """Commands pulled lazily from a generator or async iterator.
+
+    The source may yield ``RobotCommand``s, ``ProgramStep``s or whole
+    ``CommandQueue``s. The executor only asks for the next item once the
+    previous one has been sent, so arbitrarily long programs run in constant
+    memory and a slow robot holds back the producer.
+
+    A stream that is interrupted, e.g. by a button press or a dropped
+    connection, carries on where it stopped when the run is resumed,
+    resending the step it was on; any other run resets it first. Once
+    finished, a stream starts over only if its source can be iterated
+    again: a list, or a generator function called anew each time. A
+    generator or iterator can only run once.
+    """
+
+    def __init__(self, source):
+        self.source = source
+        self._items = None
+        self._buffer = deque()
+        self._pending = None
+        self._used = False
+
+    @property
+    def reusable(self) -> bool:
+        source = self.source
+        if callable(source):
+            return True
+        if hasattr(source, "__aiter__"):
+            return source.__aiter__() is not source
+        return iter(source) is not source
+
+    def _encode(self, item):
+        if isinstance(item, ProgramStep):
+            yield item
+        elif isinstance(item, CommandQueue):
+            yield from item.compile()
+        elif isinstance(item, WaitCommand):
+            yield ProgramStep(None, b"", item.duration)
+        else:
+            yield ProgramStep(item._char_uuid, item.command(), 0)
+
+    def reset(self):
+        """Forget an interrupted run, so the next one starts from the beginning."""
+        self._items = self._pending = None
+        self._buffer.clear()
+
+    def _start(self):
+        if self._used and not self.reusable:
+            raise RuntimeError(
+                "a stream from a generator or iterator can only run once; "
+                "stream a list or a generator function to run it again"
+            )
+        self._used = True
+        source = self.source() if callable(self.source) else self.source
+        if hasattr(source, "__aiter__"):
+            self._items = source.__aiter__()
+        else:
+            self._items = _aiter(source)
+
+    async def __aiter__(self):
+        if self._items is None:
+            self._start()
+
+        # hold each write back until we know whether waits follow it; the
+        # state lives on the stream so an interrupted run can pick it up
+        while True:
+            if not self._buffer:
+                try:
+                    item = await self._items.__anext__()
+                except StopAsyncIteration:
+                    break
+                self._buffer.extend(self._encode(item))
+
+            step = self._buffer[0]
+            if self._pending is not None and step.char_uuid is None:
+                self._pending = self._pending._replace(
+                    delay=self._pending.delay + step.delay
+                )
+                self._buffer.popleft()
+                continue
+            if self._pending is not None:
+                yield self._pending
+            self._pending = self._buffer.popleft()
+
+        if self._pending is not None:
+            yield self._pending
+        self._items = self._pending = None
+
+
+async def _aiter(iterable):
+    for item in iterable:
+        yield item
 
-from bleak import BleakClient
 
-from .utils import copy_asyncio_queue, empty_asyncio_queue
+class CommandQueue():
+    """Commands to send, in order.
 
+    The commands are held in a ``PersistentQueue``, so ``save()`` and
+    ``restore()`` only swap a reference and a saved queue is never changed
+    by running or extending the live one.
+    """
 
-class CommandQueue():
-    def __init__(self, name: str):
+    def __init__(self, name: str, replayed: bool = False):
         self.name = name
+        # button and key queues are compiled once and run on every press
+        self.replayed = replayed
         
-        self.queue = asyncio.Queue(maxsize=100)
+        self.queue = PersistentQueue()
         self._queue = None
 
     def put(self, command):
-        if not self.queue.full():
-            self.queue.put_nowait(command)
+        self.queue = self.queue.append(command)
 
     async def get(self):
-        return await self.queue.get()
+        if not self.queue:
+            raise asyncio.QueueEmpty
+        command, self.queue = self.queue.popleft()
+        return command
     
     def empty(self):
-        return self.queue.empty()
+        return not self.queue
     
     def led(self, red, green, blue, duration: float = 0):
         self.put(LEDCommand(red, green, blue))
@@ -49,7 +179,7 @@ class CommandQueue():
         self.wait(duration)
         return self
 
-    def displayDots(self, matrix: list[int], duration: float = 0):
+    def displayDots(self, matrix, duration: float = 0):
         self.put(DisplayDotMatrixCommand(matrix))
         self.wait(duration)
         return self
@@ -63,8 +193,23 @@ class CommandQueue():
         self.wait(duration)
         return self
 
+    def stream(self, source):
+        """Append commands produced lazily by a generator or async iterator.
+
+        Queues that are replayed need a source that can run again, such as
+        a list or a generator function.
+        """
+        stream = CommandStream(source)
+        if self.replayed and not stream.reusable:
+            raise ValueError(
+                f"{self.name} runs on every press, so it can't stream a generator "
+                "or iterator; pass a list or a generator function instead"
+            )
+        self.put(stream)
+        return self
+
     async def clear_immediate(self):
-        await empty_asyncio_queue(self.queue)
+        self.queue = PersistentQueue()
         self.clear()
         return self
     
@@ -76,158 +221,206 @@ class CommandQueue():
         return self
 
     async def save(self):
-        self._queue = await copy_asyncio_queue(self.queue)
+        self.save_sync()
 
     def save_sync(self):
         self._queue = self.queue
 
     async def restore(self):
-        if self._queue:
-            self.queue = await copy_asyncio_queue(self._queue)
+        self.restore_sync()
 
     def restore_sync(self):
-        if self._queue:
+        if self._queue is not None:
             self.queue = self._queue
 
+    def compile(self) -> tuple[ProgramStep | CommandStream, ...]:
+        """Encode the queued commands into an immutable, replayable program.
+
+        The queue itself is left untouched. Streams are kept as they are and
+        encoded lazily while the program runs.
+        """
+        steps = []
+        for command in self.queue:
+            if isinstance(command, CommandStream):
+                steps.append(command)
+            elif isinstance(command, WaitCommand):
+                if steps and isinstance(steps[-1], ProgramStep):
+                    steps[-1] = steps[-1]._replace(
+                        delay=steps[-1].delay + command.duration
+                    )
+                else:
+                    steps.append(ProgramStep(None, b"", command.duration))
+            else:
+                steps.append(ProgramStep(command._char_uuid, command.command(), 0))
+        return tuple(steps)
+
+# commands are interned until this many distinct ones exist; past that,
+# new ones are still immutable but no longer shared
+intern_limit = 4096
+_interned = {}
+
+
+def _make(cls, payload: bytes):
+    key = (cls, payload)
+    command = _interned.get(key)
+    if command is None:
+        command = object.__new__(cls)
+        object.__setattr__(command, "_payload", payload)
+        if len(_interned) < intern_limit:
+            _interned[key] = command
+    return command
+
+
 class RobotCommand:
-    def __init__(self):
-        pass
+    """An immutable command for one characteristic.
 
-    def __str__(self):
-        return f"RobotCommand: {self.command_type}"
+    The payload is encoded once when the command is built and is the only
+    thing stored per instance; the characteristic is a class attribute.
+    Equal commands are interned, so e.g. every ``MoveCommand(0, 0)`` is the
+    same object.
+    """
 
-    def command() -> bytes:
-        pass
+    __slots__ = ("_payload",)
 
-    async def execute(self, client: BleakClient):
-        pass
+    _service_uuid = None
+    _char_uuid = None
 
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
 
-class LEDCommand(RobotCommand):
-    def __init__(self, red: int, green: int, blue: int):
-        super().__init__()
+    def __eq__(self, other):
+        return type(other) is type(self) and other._payload == self._payload
 
-        self._service_uuid = "1A230001-C2ED-4D11-AD1E-FC06D8A02D37"
-        self._char_uuid = "1A230002-C2ED-4D11-AD1E-FC06D8A02D37"
+    def __hash__(self):
+        return hash((type(self), self._payload))
 
-        # limit between 0 - 255
-        self.red = min(255, max(0, red))
-        self.green = min(255, max(0, green))
-        self.blue = min(255, max(0, blue))
+    def __reduce__(self):
+        return _make, (type(self), self._payload)
 
-    def command(self):
-        return bytes([self.red, self.green, self.blue])
+    def __copy__(self):
+        return self
 
-    async def execute(self, client: BleakClient):
-        logging.debug(f"led command: {self.command()}")
-        service = client.services.get_service(self._service_uuid)
-        char = service.get_characteristic(self._char_uuid)
+    def __deepcopy__(self, memo):
+        return self
 
-        logging.debug(f"led service: {service}, config char: {char}")
+    def __str__(self):
+        return f"RobotCommand: {type(self).__name__}"
 
-        await client.write_gatt_char(char, self.command(), response=True)
-        logging.debug("sent led command")
+    def command(self) -> bytes:
+        return self._payload
 
 
-class MoveCommand(RobotCommand):
-    def __init__(self, left: int, right: int):
-        super().__init__()
+class LEDCommand(RobotCommand):
+    __slots__ = ()
 
-        self._service_uuid = "1A240001-C2ED-4D11-AD1E-FC06D8A02D37"
-        self._char_uuid = "1A240002-C2ED-4D11-AD1E-FC06D8A02D37"
+    _service_uuid = led_service_uuid
+    _char_uuid = led_characteristic_uuid
 
-        left = min(100, max(-100, left))
-        right = min(100, max(-100, right))
+    def __new__(cls, red: int, green: int, blue: int):
+        # limit between 0 - 255
+        return _make(
+            cls,
+            bytes(
+                (min(255, max(0, red)), min(255, max(0, green)), min(255, max(0, blue)))
+            ),
+        )
 
-        self.left_fwd = left if left > 0 else 0
-        self.left_rev = -left if left < 0 else 0
-        self.right_fwd = right if right > 0 else 0
-        self.right_rev = -right if right < 0 else 0
+    red = property(lambda self: self._payload[0])
+    green = property(lambda self: self._payload[1])
+    blue = property(lambda self: self._payload[2])
 
-    def command(self):
-        return bytes([self.left_fwd, self.left_rev, self.right_fwd, self.right_rev])
 
-    async def execute(self, client: BleakClient):
-        logging.debug(f"wheels command: {self.command()}")
-        service = client.services.get_service(self._service_uuid)
-        char = service.get_characteristic(self._char_uuid)
+class MoveCommand(RobotCommand):
+    __slots__ = ()
+
+    _service_uuid = motor_service_uuid
+    _char_uuid = motor_characteristic_uuid
 
-        await client.write_gatt_char(char, self.command(), response=True)
-        logging.debug("sent wheels command")
+    def __new__(cls, left: int, right: int):
+        left = min(100, max(-100, left))
+        right = min(100, max(-100, right))
 
+        return _make(
+            cls,
+            bytes(
+                (
+                    left if left > 0 else 0,
+                    -left if left < 0 else 0,
+                    right if right > 0 else 0,
+                    -right if right < 0 else 0,
+                )
+            ),
+        )
 
-class DisplayTextCommand(RobotCommand):
-    def __init__(self, text: str):
-        super().__init__()
+    left_fwd = property(lambda self: self._payload[0])
+    left_rev = property(lambda self: self._payload[1])
+    right_fwd = property(lambda self: self._payload[2])
+    right_rev = property(lambda self: self._payload[3])
 
-        self._service_uuid = "1A250001-C2ED-4D11-AD1E-FC06D8A02D37"
-        self._char_uuid = "1A250002-C2ED-4D11-AD1E-FC06D8A02D37"
 
-        self.text = text
+class DisplayTextCommand(RobotCommand):
+    __slots__ = ()
 
-    def command(self):
-        return bytes([0x01] + list(self.text.encode("ascii")))
+    _service_uuid = display_service_uuid
+    _char_uuid = display_characteristic_uuid
 
-    async def execute(self, client: BleakClient):
-        logging.debug(f"display text command: {self.text} (command: {self.command()})")
-        service = client.services.get_service(self._service_uuid)
-        char = service.get_characteristic(self._char_uuid)
+    def __new__(cls, text: str):
+        return _make(cls, b"\x01" + text.encode("ascii"))
 
-        await client.write_gatt_char(char, self.command(), response=True)
-        logging.debug("sent display text command")
+    @property
+    def text(self) -> str:
+        return self._payload[1:].decode("ascii")
 
 
 class DisplayDotMatrixCommand(RobotCommand):
-    def __init__(self, matrix: list[int] = [0] * 25):
-        super().__init__()
+    __slots__ = ()
 
-        self._service_uuid = "1A250001-C2ED-4D11-AD1E-FC06D8A02D37"
-        self._char_uuid = "1A250002-C2ED-4D11-AD1E-FC06D8A02D37"
+    _service_uuid = display_service_uuid
+    _char_uuid = display_characteristic_uuid
 
-        self.matrix = matrix
+    def __new__(cls, matrix=None):
+        if matrix is None:
+            payload = _blank_dots
+        elif hasattr(matrix, "payload"):
+            # frames from weallcode_robot.frames carry their encoded payload
+            payload = matrix.payload
+        else:
+            payload = bytes([0x02, *matrix])
+        return _make(cls, payload)
 
-    def command(self):
-        return bytes([0x02] + self.matrix)
+    @property
+    def matrix(self) -> list[int]:
+        return list(self._payload[1:])
 
-    async def execute(self, client: BleakClient):
-        logging.debug(
-            f"display text command: {self.matrix} (command: {self.command()})"
-        )
-        service = client.services.get_service(self._service_uuid)
-        char = service.get_characteristic(self._char_uuid)
 
-        await client.write_gatt_char(char, self.command(), response=True)
-        logging.debug("sent display text command")
+_blank_dots = bytes([0x02] + [0] * 25)
 
 
 class BuzzerCommand(RobotCommand):
-    def __init__(self, frequency: int):
-        super().__init__()
+    __slots__ = ()
 
-        self._service_uuid = "1A260001-C2ED-4D11-AD1E-FC06D8A02D37"
-        self._char_uuid = "1A260002-C2ED-4D11-AD1E-FC06D8A02D37"
+    _service_uuid = buzzer_service_uuid
+    _char_uuid = buzzer_characteristic_uuid
 
-        self.frequency = frequency
+    def __new__(cls, frequency: int):
+        return _make(cls, frequency.to_bytes(2, "big"))
 
-    def command(self):
-        return self.frequency.to_bytes(2, "big")
+    @property
+    def frequency(self) -> int:
+        return int.from_bytes(self._payload, "big")
 
-    async def execute(self, client: BleakClient):
-        logging.debug(f"buzzer command: {self.frequency}Hz, ({self.command()})")
-        service = client.services.get_service(self._service_uuid)
-        char = service.get_characteristic(self._char_uuid)
 
-        await client.write_gatt_char(char, self.command(), response=True)
-        logging.debug("sent buzzer command")
+class WaitCommand(RobotCommand):
+    __slots__ = ()
 
+    def __new__(cls, duration: float):
+        # the payload of a wait is its duration, so equal waits are shared too
+        return _make(cls, duration)
 
-class WaitCommand(RobotCommand):
-    def __init__(self, duration: float):
-        super().__init__()
-        self.duration = duration
+    @property
+    def duration(self) -> float:
+        return self._payload
 
-    def command(self):
+    def command(self) -> bytes:
         return bytes()
 
-    async def execute(self, client: BleakClient):
-        await asyncio.sleep(self.duration)
@@ -0,0 +1,220 @@
+import logging
+
+import bleak
+from bleak import BleakClient
+from bleak.backends.device import BLEDevice
+
+from .characteristics import CharacteristicRegistry
+from .commands import CommandQueue
+from .control import setpoints
+from .discovery import AddressCache, DiscoveryBatch, discover
+from .executor import ProgramExecutor
+from .probe import LinkProfile, apply, probe
+from .stats import RobotStats
+from .telemetry import Telemetry, decode_uint
+from .transport import RobotTransport
+from .utils import RobotState, device_name_map
+
+logger = logging.getLogger(__name__)
+
+
+class RobotNotFoundError(Exception):
+    pass
+
+
+class RobotConnection:
+    """A BLE connection to one robot, independent of any UI.
+
+    ``backend`` provides the ``BleakClient`` and ``BleakScanner`` classes to
+    use; it defaults to bleak itself, or pass a ``Simulator``. Writes are
+    appended to ``recorder`` if one is given. Notifications subscribed to
+    with ``subscribe()`` are kept in ``telemetry`` and survive reconnects.
+    With ``auto_tune=True`` the link is probed on every connect and the
+    transport and executor are tuned to it; see ``tune()``. Scans go
+    through ``discovery`` if given, so robots connecting together share one.
+    """
+
+    def __init__(
+        self,
+        name,
+        streaming=False,
+        timeline=False,
+        on_status=None,
+        address_cache=None,
+        on_disconnect=None,
+        backend=None,
+        stats=None,
+        recorder=None,
+        telemetry=None,
+        auto_tune=False,
+        discovery: DiscoveryBatch = None,
+    ):
+        self.display_name = name
+        if self.display_name not in device_name_map:
+            self.name = self.display_name
+        else:
+            self.name = device_name_map[self.display_name]
+
+        self.streaming = streaming
+        self.timeline = timeline
+        self.on_status = on_status
+        self.on_disconnect = on_disconnect
+        self.backend = backend or bleak
+        self.stats = stats if stats is not None else RobotStats()
+        self.recorder = recorder
+        self.telemetry = telemetry if telemetry is not None else Telemetry()
+        self._subscriptions = {}
+        self.auto_tune = auto_tune
+        self.discovery = discovery
+        self.link = None
+        if address_cache is None:
+            address_cache = (
+                getattr(self.backend, "address_cache", None) or AddressCache()
+            )
+        self.address_cache = address_cache
+
+        self.state = RobotState.DISCONNECTED
+        self.client = None
+        self.characteristics = None
+        self.transport = None
+        self.executor = None
+
+        self.clear_program = CommandQueue("clear").clear().clearDisplay().compile()
+
+    def update_status(self, status):
+        if self.on_status is not None:
+            self.on_status(status)
+
+    @property
+    def is_connected(self) -> bool:
+        return self.client is not None and self.client.is_connected
+
+    def _disconnected_callback(self, client: BleakClient):
+        logger.debug("%s disconnected", self.name)
+        self.state = RobotState.DISCONNECTED
+        if self.on_disconnect is not None:
+            self.on_disconnect(self)
+
+    async def connect(self, timeout: float = 10.0, device: BLEDevice | None = None):
+        """Connect to the robot.
+
+        Without a ``device`` the cached address from the last successful
+        connection is tried first; if that fails the cache entry is dropped
+        and the robot is scanned for.
+        """
+        self.state = RobotState.CONNECTING
+
+        if device is None:
+            address = self.address_cache.get(self.name)
+            if address is not None:
+                self.update_status(
+                    f"connecting to {self.display_name} at {address} ..."
+                )
+                try:
+                    await self._connect_to(address)
+                    return
+                except Exception as e:
+                    logger.debug(
+                        "cached address %s for %s failed: %r", address, self.name, e
+                    )
+                    self.address_cache.invalidate(self.name)
+
+            self.update_status(f"scanning for {self.display_name} ...")
+            if self.discovery is not None:
+                device = await self.discovery.find(self.name, timeout, self.backend)
+            else:
+                found = await discover(
+                    [self.name], timeout=timeout, backend=self.backend
+                )
+                device = found.get(self.name)
+
+        if device is None:
+            self.state = RobotState.DISCONNECTED
+            raise RobotNotFoundError(f"device {self.name} not found")
+
+        self.update_status(f"found device {device.name} at {device.address}")
+        logger.debug("found device %s at %s", device.name, device.address)
+
+        try:
+            await self._connect_to(device)
+        except Exception:
+            self.address_cache.invalidate(self.name)
+            self.state = RobotState.DISCONNECTED
+            raise
+
+    async def _connect_to(self, device: BLEDevice | str):
+        self.client = self.backend.BleakClient(
+            device, disconnected_callback=self._disconnected_callback
+        )
+        self.update_status("connecting ...")
+        await self.client.connect()
+
+        try:
+            self.characteristics = CharacteristicRegistry.build(self.client)
+        except Exception:
+            await self.disconnect()
+            raise
+
+        self.transport = RobotTransport(
+            self.client, self.characteristics, streaming=self.streaming
+        )
+        self.executor = ProgramExecutor(
+            self.transport, timeline=self.timeline, stats=self.stats
+        )
+        self.executor.recorder = self.recorder
+
+        for char_uuid, decode in self._subscriptions.items():
+            await self.client.start_notify(
+                char_uuid, self.telemetry.callback(char_uuid, decode)
+            )
+
+        self.address_cache.set(self.name, self.client.address)
+        self.state = RobotState.CONNECTED_IDLE
+        self.update_status("connected")
+
+        if self.auto_tune:
+            await self.tune()
+
+    async def tune(self, samples: int = 3) -> LinkProfile:
+        """Measure the link and tune the transport and executor to it.
+
+        Writes the clear program a few times to time acknowledged writes per
+        characteristic and reads the MTU. From that, the streaming window,
+        write mode, minimum step spacing and the largest unacknowledged
+        payload are set.
+        """
+        self.link = await probe(self.executor, setpoints(self.clear_program), samples)
+        apply(self.executor, self.link, streaming=self.streaming)
+        self.update_status(f"connected ({self.link.summary()})")
+        return self.link
+
+    async def subscribe(self, char_uuid: str, listener=None, decode=decode_uint):
+        """Keep notifications from a characteristic in ``telemetry``.
+
+        ``listener`` is called with each decoded value. The subscription is
+        renewed every time the robot connects.
+        """
+        if listener is not None:
+            self.telemetry.listen(char_uuid, listener)
+        self._subscriptions[char_uuid] = decode
+        if self.is_connected:
+            await self.client.start_notify(
+                char_uuid, self.telemetry.callback(char_uuid, decode)
+            )
+
+    async def disconnect(self):
+        if self.client is not None:
+            await self.client.disconnect()
+        self.state = RobotState.DISCONNECTED
+
+    def compile(self, commands: CommandQueue):
+        """Compile a queue into a program that leaves the robot cleared."""
+        return self.executor.optimize(commands.compile() + self.clear_program)
+
+    async def run(self, program, start: int = 0, resume: bool = False):
+        self.state = RobotState.RUNNING
+        try:
+            await self.executor.run(program, start=start, resume=resume)
+        finally:
+            if self.state == RobotState.RUNNING:
+                self.state = RobotState.CONNECTED_IDLE
@@ -0,0 +1,136 @@
+import asyncio
+import logging
+import time
+
+from .commands import CommandStream, LEDCommand, MoveCommand, ProgramStep, _aiter
+from .executor import ProgramExecutor
+from .utils import led_characteristic_uuid, motor_characteristic_uuid
+
+logger = logging.getLogger(__name__)
+
+
+def setpoints(
+    program: tuple[ProgramStep, ...], characteristics=None
+) -> dict[str, bytes]:
+    """The last payload a compiled program writes to each characteristic.
+
+    Only ``characteristics`` are kept, if given.
+    """
+    result = {}
+    for step in program:
+        if isinstance(step, CommandStream) or step.char_uuid is None:
+            continue
+        if characteristics is not None and step.char_uuid not in characteristics:
+            continue
+        result[step.char_uuid] = step.payload
+    return result
+
+
+class ContinuousControl:
+    """Drives the robot from a stream of setpoints, e.g. held keys.
+
+    Setpoints overwrite each other until they are sent, so however fast
+    input arrives at most one write per characteristic goes out every
+    ``1 / rate`` seconds, always with the newest value. If ``hold`` is not
+    called again within ``timeout`` seconds the ``release`` setpoints are
+    sent, which stops the motors by default. Terminals only report key
+    repeats, so this is also how a released key is noticed.
+    """
+
+    def __init__(
+        self,
+        executor: ProgramExecutor,
+        rate: float = 20.0,
+        timeout: float = 0.5,
+        release: dict[str, bytes] = None,
+    ):
+        self.executor = executor
+        self.interval = 1.0 / rate
+        self.timeout = timeout
+        if release is None:
+            release = {motor_characteristic_uuid: MoveCommand(0, 0).command()}
+        self.release_setpoints = release
+
+        self._pending = {}
+        self._deadline = None
+        self._changed = asyncio.Event()
+        self._task = None
+
+    @property
+    def active(self) -> bool:
+        return self._deadline is not None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def __aenter__(self):
+        self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        self.release()
+        await self._flush()
+        await self.stop()
+
+    def hold(self, setpoints: dict[str, bytes]):
+        """Set the latest values and keep them for another ``timeout``."""
+        for char_uuid, payload in setpoints.items():
+            if self._pending.pop(char_uuid, None) is not None:
+                self.executor.stats.writes_merged += 1
+            self._pending[char_uuid] = payload
+        self._deadline = time.monotonic() + self.timeout
+        self._changed.set()
+
+    def drive(self, left: int, right: int):
+        self.hold({motor_characteristic_uuid: MoveCommand(left, right).command()})
+
+    def led(self, r: int, g: int, b: int):
+        self.hold({led_characteristic_uuid: LEDCommand(r, g, b).command()})
+
+    def release(self):
+        self._pending.update(self.release_setpoints)
+        self._deadline = None
+        self._changed.set()
+
+    async def follow(self, source):
+        """Drive from an iterable or async iterable of ``(left, right)`` speeds.
+
+        The robot is released when the source runs out.
+        """
+        items = source if hasattr(source, "__aiter__") else _aiter(source)
+        try:
+            async for left, right in items:
+                self.drive(left, right)
+        finally:
+            self.release()
+
+    async def _flush(self):
+        pending, self._pending = self._pending, {}
+        for char_uuid, payload in pending.items():
+            await self.executor.write(char_uuid, payload)
+
+    async def _run(self):
+        while True:
+            await self._changed.wait()
+            self._changed.clear()
+
+            tick = time.monotonic()
+            while self._pending or self._deadline is not None:
+                if self._deadline is not None and time.monotonic() >= self._deadline:
+                    logger.debug("no input for %.2f s, releasing", self.timeout)
+                    self.release()
+                await self._flush()
+
+                tick += self.interval
+                now = time.monotonic()
+                if tick > now:
+                    await asyncio.sleep(tick - now)
+                else:
+                    tick = now
@@ -0,0 +1,183 @@
+import asyncio
+import logging
+
+from .commands import CommandQueue
+from .connection import RobotConnection
+from .stats import RobotStats
+from .telemetry import Telemetry
+from .utils import DisconnectPolicy
+
+logger = logging.getLogger(__name__)
+
+
+class RobotDaemon:
+    """Keep one robot connected and run programs submitted to it.
+
+    The BLE connection stays open across submissions. If it drops, the
+    daemon reconnects with exponential backoff and then resumes, restarts
+    or aborts the interrupted program according to ``policy``.
+
+    Use it as an async context manager::
+
+        async with RobotDaemon("beep") as robot:
+            await robot.submit(CommandQueue("spin").move(-100, 100, 1))
+    """
+
+    def __init__(
+        self,
+        name,
+        streaming=False,
+        timeline=False,
+        policy: DisconnectPolicy = DisconnectPolicy.RESUME,
+        min_backoff: float = 0.5,
+        max_backoff: float = 30.0,
+        disconnect_grace: float = 1.0,
+        address_cache=None,
+        on_status=None,
+        backend=None,
+    ):
+        self.policy = policy
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.disconnect_grace = disconnect_grace
+
+        self.connection = RobotConnection(
+            name,
+            streaming=streaming,
+            timeline=timeline,
+            on_status=on_status,
+            address_cache=address_cache,
+            on_disconnect=self._on_disconnect,
+            backend=backend,
+        )
+
+        self.reconnects = 0
+        self._programs = None
+        self._connected = None
+        self._disconnected = None
+        self._tasks = []
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+    async def start(self):
+        self._programs = asyncio.Queue()
+        self._connected = asyncio.Event()
+        self._disconnected = asyncio.Event()
+        self._tasks = [
+            asyncio.create_task(self._keep_connected()),
+            asyncio.create_task(self._run_programs()),
+        ]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        while self._programs is not None and not self._programs.empty():
+            _, future = self._programs.get_nowait()
+            if not future.done():
+                future.cancel()
+
+        await self.connection.disconnect()
+
+    def stats(self) -> RobotStats:
+        return self.connection.stats
+
+    def telemetry(self) -> Telemetry:
+        return self.connection.telemetry
+
+    async def subscribe(self, char_uuid: str, listener=None, **kwargs):
+        """Record notifications from a characteristic, across reconnects."""
+        await self.connection.subscribe(char_uuid, listener, **kwargs)
+
+    def submit(self, commands, clear: bool = True) -> asyncio.Future:
+        """Queue a program; the returned future resolves once it has run."""
+        if isinstance(commands, CommandQueue):
+            commands = commands.compile()
+        if clear:
+            # also accepts lists and loaded PackedPrograms
+            commands = tuple(commands) + self.connection.clear_program
+
+        future = asyncio.get_running_loop().create_future()
+        self._programs.put_nowait((commands, future))
+        return future
+
+    def _on_disconnect(self, connection: RobotConnection):
+        if self._connected is not None:
+            self._connected.clear()
+            self._disconnected.set()
+
+    async def _keep_connected(self):
+        backoff = self.min_backoff
+        while True:
+            try:
+                await self.connection.connect()
+            except Exception as e:
+                logger.debug("connecting to %s failed: %r", self.connection.name, e)
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+                continue
+
+            backoff = self.min_backoff
+            self._disconnected.clear()
+            self._connected.set()
+
+            await self._disconnected.wait()
+            self.reconnects += 1
+
+    async def _run_programs(self):
+        while True:
+            program, future = await self._programs.get()
+            if future.cancelled():
+                continue
+
+            try:
+                await self._run(program)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(None)
+
+    async def _dropped(self, client) -> bool:
+        """Whether a client lost its link, allowing the disconnect to be noticed."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.disconnect_grace
+        while client.is_connected and loop.time() < deadline:
+            await asyncio.sleep(0.05)
+        return not client.is_connected
+
+    async def _run(self, program):
+        await self._connected.wait()
+        program = self.connection.executor.optimize(program)
+
+        start = 0
+        resume = False
+        while True:
+            await self._connected.wait()
+            client = self.connection.client
+            executor = self.connection.executor
+            try:
+                await self.connection.run(program, start=start, resume=resume)
+                return
+            except Exception:
+                if self.policy == DisconnectPolicy.ABORT or not await self._dropped(
+                    client
+                ):
+                    raise
+
+                resume = self.policy == DisconnectPolicy.RESUME
+                start = executor.position if resume else 0
+                logger.debug(
+                    "%s dropped during a program, %s from step %d",
+                    self.connection.name,
+                    self.policy.name.lower(),
+                    start,
+                )
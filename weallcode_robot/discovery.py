@@ -0,0 +1,126 @@
+import asyncio
+import json
+import logging
+import os
+from pathlib import Path
+
+import bleak
+from bleak.backends.device import BLEDevice
+
+logger = logging.getLogger(__name__)
+
+
+def default_cache_path() -> Path:
+    cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(cache_home) / "weallcode_robot" / "addresses.json"
+
+
+class AddressCache:
+    """Robot name to BLE address map persisted between runs."""
+
+    def __init__(self, path=None):
+        self.path = Path(path) if path is not None else default_cache_path()
+        self._addresses = None
+
+    @property
+    def addresses(self) -> dict[str, str]:
+        if self._addresses is None:
+            try:
+                self._addresses = json.loads(self.path.read_text())
+            except (OSError, ValueError):
+                self._addresses = {}
+        return self._addresses
+
+    def get(self, name: str) -> str | None:
+        return self.addresses.get(name)
+
+    def set(self, name: str, address: str):
+        if self.addresses.get(name) != address:
+            self.addresses[name] = address
+            self.save()
+
+    def invalidate(self, name: str):
+        if self.addresses.pop(name, None) is not None:
+            self.save()
+
+    def save(self):
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(self.addresses, indent=2, sort_keys=True))
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logger.debug("could not save address cache %s: %s", self.path, e)
+
+
+async def discover(names, timeout: float = 10.0, backend=None) -> dict[str, BLEDevice]:
+    """Find every named robot in a single scan.
+
+    Returns as soon as all names have been seen, or after ``timeout`` with
+    whatever was found. ``backend`` provides ``BleakScanner`` and defaults
+    to bleak itself.
+    """
+    backend = backend or bleak
+    remaining = set(names)
+    found = {}
+    if not remaining:
+        return found
+
+    all_found = asyncio.Event()
+
+    def _detection_callback(device, advertisement_data):
+        name = advertisement_data.local_name or device.name
+        if name in remaining:
+            logger.debug("discovered %s at %s", name, device.address)
+            found[name] = device
+            remaining.discard(name)
+            if not remaining:
+                all_found.set()
+
+    async with backend.BleakScanner(detection_callback=_detection_callback):
+        try:
+            await asyncio.wait_for(all_found.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    return found
+
+
+class DiscoveryBatch:
+    """Finds robots asked for at about the same time in one shared scan.
+
+    The first ``find()`` waits ``window`` seconds for others to join, then
+    a single ``discover()`` looks for every name asked for by then.
+    """
+
+    def __init__(self, window: float = 0.1):
+        self.window = window
+        self._waiting = {}
+
+    async def find(
+        self, name: str, timeout: float = 10.0, backend=None
+    ) -> BLEDevice | None:
+        waiting = self._waiting.get(backend)
+        if waiting is None:
+            waiting = self._waiting[backend] = {}
+            asyncio.ensure_future(self._scan(backend, timeout))
+        future = asyncio.get_running_loop().create_future()
+        waiting.setdefault(name, []).append(future)
+        return await future
+
+    async def _scan(self, backend, timeout: float):
+        await asyncio.sleep(self.window)
+        waiting = self._waiting.pop(backend)
+        logger.debug("scanning for %d robots at once", len(waiting))
+        try:
+            found = await discover(list(waiting), timeout=timeout, backend=backend)
+        except Exception as e:
+            for futures in waiting.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+            return
+        for name, futures in waiting.items():
+            for future in futures:
+                if not future.done():
+                    future.set_result(found.get(name))
@@ -0,0 +1,232 @@
+import asyncio
+import logging
+import time
+
+from .commands import CommandStream, ProgramStep, idempotent
+from .stats import RobotStats
+from .transport import RobotTransport
+from .utils import characteristic_names
+
+logger = logging.getLogger(__name__)
+
+
+class ProgramExecutor:
+    """Replays compiled programs over a robot transport.
+
+    The executor keeps a shadow of the last payload the robot acknowledged
+    on each characteristic and skips writes that would not change anything.
+
+    With ``timeline=True`` a program is laid out on ``time.monotonic()`` and
+    every step fires at its absolute deadline, so the time spent writing is
+    taken out of the following wait instead of adding up. ``lateness`` holds
+    how far behind its deadline each stage of the last run started.
+
+    Adjacent writes to different characteristics with no wait between them
+    form a stage and, with ``concurrent`` set, are sent together. Writes
+    to one characteristic keep their order, and a wait always ends a stage.
+
+    ``position`` is the index of the first step of the stage being
+    executed, so an interrupted program can be resumed with
+    ``run(program, start=position)``. Streams inside a program are
+    expanded lazily as they are reached.
+
+    Write latency, skipped writes, queue depth and wait lateness are
+    recorded in ``stats``. ``on_write``, if set, is called with the
+    characteristic of every write, including those the shadow skips.
+    Writes that go out are also appended to ``recorder`` if one is set.
+    """
+
+    def __init__(
+        self,
+        transport: RobotTransport,
+        timeline: bool = False,
+        stats: RobotStats = None,
+    ):
+        self.transport = transport
+        self.timeline = timeline
+        self.stats = stats if stats is not None else RobotStats()
+        self.shadow = {}
+        self.lateness = []
+        self.position = 0
+        self.on_write = None
+        self.recorder = None
+        self.min_interval = 0.0
+        self.concurrent = True
+
+    def optimize(self, program: tuple[ProgramStep, ...]) -> tuple[ProgramStep, ...]:
+        """Merge writes to the same characteristic with no wait between them.
+
+        Within a run of steps that happen at the same instant only the last
+        write to each characteristic is kept, unless an earlier one isn't
+        idempotent (scrolling text), which is sent in order. Steps less than
+        ``min_interval`` apart count as the same instant, so a link that
+        can't keep up drops intermediate values instead of falling behind.
+        """
+        optimized = []
+        pending = {}
+        held = 0.0
+
+        def flush():
+            nonlocal held
+            if pending:
+                *first, last = pending.values()
+                optimized.extend(step._replace(delay=0) for step in first)
+                optimized.append(last._replace(delay=held))
+                pending.clear()
+            elif held > 0:
+                if optimized and isinstance(optimized[-1], ProgramStep):
+                    optimized[-1] = optimized[-1]._replace(
+                        delay=optimized[-1].delay + held
+                    )
+                else:
+                    optimized.append(ProgramStep(None, None, held))
+            held = 0.0
+
+        for step in program:
+            if isinstance(step, CommandStream):
+                flush()
+                optimized.append(step)
+                continue
+
+            if step.char_uuid is None:
+                if held == 0 and not pending:
+                    held = step.delay
+                    flush()
+                    continue
+                held += step.delay
+                if held >= self.min_interval:
+                    flush()
+                continue
+
+            previous = pending.get(step.char_uuid)
+            if previous is not None and not idempotent(
+                previous.char_uuid, previous.payload
+            ):
+                # text scrolls once per write, so it is sent, never replaced
+                flush()
+            elif pending.pop(step.char_uuid, None) is not None:
+                self.stats.writes_merged += 1
+            pending[step.char_uuid] = step
+            held += step.delay
+
+            if held > 0 and held >= self.min_interval:
+                flush()
+
+        flush()
+        return tuple(optimized)
+
+    async def write(self, char_uuid: str, payload: bytes):
+        if self.on_write is not None:
+            self.on_write(char_uuid)
+        if self.shadow.get(char_uuid) == payload and idempotent(char_uuid, payload):
+            self.stats.writes_saved += 1
+            return
+
+        # the robot's state is unknown until the write goes through
+        self.shadow.pop(char_uuid, None)
+        if self.recorder is not None:
+            self.recorder.record(char_uuid, payload)
+        logger.debug(
+            "write %s %r", characteristic_names.get(char_uuid, char_uuid), payload
+        )
+        start = time.perf_counter()
+        acknowledged = await self.transport.write(char_uuid, payload)
+        self.stats.record_write(char_uuid, len(payload), time.perf_counter() - start)
+        # an unacknowledged write may have been lost, so it isn't trusted
+        if acknowledged:
+            self.shadow[char_uuid] = payload
+
+    async def _steps(self, program, start: int, resume: bool):
+        for self.position, step in enumerate(program[start:], start):
+            self.stats.queue_depth = len(program) - self.position
+            if isinstance(step, CommandStream):
+                # only a resumed run carries on the stream it stopped in
+                if not (resume and self.position == start):
+                    step.reset()
+                async for streamed in step:
+                    yield streamed
+            else:
+                yield step
+
+    async def _stages(self, program, start: int, resume: bool):
+        """Group steps into stages, each with the delay that follows it."""
+        stage = {}
+        first = start
+        async for char_uuid, payload, delay in self._steps(program, start, resume):
+            if char_uuid in stage:
+                current, self.position = self.position, first
+                yield stage, 0.0
+                stage = {}
+                self.position = current
+            if not stage:
+                first = self.position
+            if char_uuid is not None:
+                stage[char_uuid] = payload
+            if delay > 0:
+                self.position = first
+                yield stage, delay
+                stage = {}
+        if stage:
+            self.position = first
+            yield stage, 0.0
+
+    async def _dispatch(self, stage: dict[str, bytes]):
+        if len(stage) == 1 or not self.concurrent:
+            for char_uuid, payload in stage.items():
+                await self.write(char_uuid, payload)
+        else:
+            await asyncio.gather(
+                *(
+                    self.write(char_uuid, payload)
+                    for char_uuid, payload in stage.items()
+                )
+            )
+
+    async def run(
+        self, program: tuple[ProgramStep, ...], start: int = 0, resume: bool = False
+    ):
+        """Run a program from step ``start``.
+
+        With ``resume`` set, a stream at ``start`` carries on from where an
+        interrupted run left it; otherwise every stream starts over.
+        """
+        if self.timeline:
+            return await self.run_timeline(program, start=start, resume=resume)
+
+        try:
+            async for stage, delay in self._stages(program, start, resume):
+                if stage:
+                    await self._dispatch(stage)
+                if delay > 0:
+                    due = time.monotonic() + delay
+                    await asyncio.sleep(delay)
+                    self.stats.lateness.observe(max(0.0, time.monotonic() - due))
+        finally:
+            self.stats.queue_depth = 0
+
+    async def run_timeline(
+        self, program: tuple[ProgramStep, ...], start: int = 0, resume: bool = False
+    ) -> list[float]:
+        self.lateness = lateness = []
+        deadline = time.monotonic()
+
+        try:
+            async for stage, delay in self._stages(program, start, resume):
+                now = time.monotonic()
+                if now < deadline:
+                    await asyncio.sleep(deadline - now)
+                    now = time.monotonic()
+                lateness.append(max(0.0, now - deadline))
+                self.stats.lateness.observe(lateness[-1])
+
+                if stage:
+                    await self._dispatch(stage)
+                deadline += delay
+        finally:
+            self.stats.queue_depth = 0
+
+        remaining = deadline - time.monotonic()
+        if remaining > 0:
+            await asyncio.sleep(remaining)
+
+        return lateness
@@ -0,0 +1,142 @@
+import asyncio
+import logging
+
+from .commands import CommandQueue
+from .connection import RobotConnection, RobotNotFoundError
+from .discovery import AddressCache, discover
+from .stats import RobotStats, to_prometheus
+from .utils import RobotState
+
+logger = logging.getLogger(__name__)
+
+
+class FleetMember(CommandQueue):
+    """One robot in a fleet: its program, connection and outcome."""
+
+    def __init__(
+        self, name, streaming=False, timeline=False, address_cache=None, backend=None
+    ):
+        super().__init__(name)
+        self.connection = RobotConnection(
+            name,
+            streaming=streaming,
+            timeline=timeline,
+            address_cache=address_cache,
+            backend=backend,
+        )
+        self.error = None
+
+    @property
+    def state(self) -> RobotState:
+        return self.connection.state
+
+    def stats(self) -> RobotStats:
+        return self.connection.stats
+
+    def __repr__(self):
+        return (
+            f"FleetMember({self.name!r}, state={self.state.name}, error={self.error!r})"
+        )
+
+
+class Fleet:
+    """Drive many robots side by side from a single asyncio loop.
+
+    Robots without a cached address are found in one shared scan, then at
+    most ``max_connecting`` of them are connected at once; programs run
+    concurrently. A robot that fails ends up in
+    ``RobotState.FAILED`` with its exception in ``error`` and does not
+    affect the others.
+    """
+
+    def __init__(
+        self,
+        names,
+        max_connecting: int = 4,
+        streaming=False,
+        timeline=False,
+        scan_timeout: float = 10.0,
+        address_cache=None,
+        backend=None,
+    ):
+        self.max_connecting = max_connecting
+        self.scan_timeout = scan_timeout
+        self.backend = backend
+        if address_cache is None:
+            address_cache = getattr(backend, "address_cache", None) or AddressCache()
+        self.address_cache = address_cache
+        self.members = {
+            name: FleetMember(
+                name,
+                streaming=streaming,
+                timeline=timeline,
+                address_cache=self.address_cache,
+                backend=backend,
+            )
+            for name in names
+        }
+
+    def __getitem__(self, name) -> FleetMember:
+        return self.members[name]
+
+    def __iter__(self):
+        return iter(self.members.values())
+
+    def __len__(self):
+        return len(self.members)
+
+    def status(self) -> dict[str, RobotState]:
+        return {name: member.state for name, member in self.members.items()}
+
+    def stats(self) -> dict[str, RobotStats]:
+        return {name: member.stats() for name, member in self.members.items()}
+
+    def to_prometheus(self) -> str:
+        return to_prometheus(self.stats())
+
+    async def _run_member(
+        self, member: FleetMember, connecting: asyncio.Semaphore, devices
+    ):
+        state = RobotState.FAILED
+        try:
+            name = member.connection.name
+            if name not in devices and self.address_cache.get(name) is None:
+                raise RobotNotFoundError(f"device {name} not found")
+
+            async with connecting:
+                await member.connection.connect(
+                    timeout=self.scan_timeout, device=devices.get(name)
+                )
+            await member.connection.run(member.connection.compile(member))
+            state = RobotState.DONE
+        except Exception as e:
+            logger.debug("%s failed: %r", member.name, e)
+            member.error = e
+        finally:
+            try:
+                await member.connection.disconnect()
+            except Exception as e:
+                logger.debug("%s failed to disconnect: %r", member.name, e)
+            member.connection.state = state
+
+    async def run_async(self) -> dict[str, FleetMember]:
+        uncached = [
+            member.connection.name
+            for member in self.members.values()
+            if self.address_cache.get(member.connection.name) is None
+        ]
+        devices = await discover(
+            uncached, timeout=self.scan_timeout, backend=self.backend
+        )
+
+        connecting = asyncio.Semaphore(self.max_connecting)
+        await asyncio.gather(
+            *(
+                self._run_member(member, connecting, devices)
+                for member in self.members.values()
+            )
+        )
+        return self.members
+
+    def run(self) -> dict[str, FleetMember]:
+        return asyncio.run(self.run_async())
@@ -0,0 +1,154 @@
+"""5x5 display frames stored as 25-bit masks.
+
+Bit ``row * 5 + col`` is the dot at that position, in the same order as the
+list passed to ``displayDots``. Whole-frame operations are a handful of
+integer operations, frames are immutable, identical ones are shared (up to
+``intern_limit`` of them), and each frame encodes its display payload only
+once.
+"""
+
+from .commands import ProgramStep
+from .utils import display_characteristic_uuid
+
+WIDTH = HEIGHT = 5
+FULL = (1 << (WIDTH * HEIGHT)) - 1
+
+# _columns_from[c] has every dot in columns c..4 lit
+_columns_from = [
+    sum(1 << (row * WIDTH + col) for row in range(HEIGHT) for col in range(c, WIDTH))
+    for c in range(WIDTH + 1)
+]
+
+
+# frames are interned until this many distinct ones exist; past that, new
+# ones are still immutable but no longer shared
+intern_limit = 4096
+
+
+class Frame:
+    __slots__ = ("mask", "_payload")
+
+    _interned = {}
+
+    def __new__(cls, mask: int = 0):
+        mask &= FULL
+        frame = cls._interned.get(mask)
+        if frame is None:
+            frame = super().__new__(cls)
+            object.__setattr__(frame, "mask", mask)
+            object.__setattr__(frame, "_payload", None)
+            if len(cls._interned) < intern_limit:
+                cls._interned[mask] = frame
+        return frame
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Frame is immutable")
+
+    def __eq__(self, other):
+        return isinstance(other, Frame) and other.mask == self.mask
+
+    def __hash__(self):
+        return hash(self.mask)
+
+    def __reduce__(self):
+        return (Frame, (self.mask,))
+
+    @classmethod
+    def from_dots(cls, dots) -> "Frame":
+        mask = 0
+        for i, dot in enumerate(dots):
+            if dot:
+                mask |= 1 << i
+        return cls(mask)
+
+    @classmethod
+    def from_rows(cls, *rows: str) -> "Frame":
+        """Build a frame from strings such as ``"#...#"``; spaces and dots are off."""
+        return cls.from_dots(
+            ch not in " ." for row in rows for ch in row.ljust(WIDTH)[:WIDTH]
+        )
+
+    @classmethod
+    def row(cls, row: int) -> "Frame":
+        return cls(0b11111 << (row * WIDTH)) if 0 <= row < HEIGHT else cls(0)
+
+    @classmethod
+    def column(cls, col: int) -> "Frame":
+        if not 0 <= col < WIDTH:
+            return cls(0)
+        return cls(_columns_from[col] & ~_columns_from[col + 1])
+
+    @property
+    def dots(self) -> list[int]:
+        return [(self.mask >> i) & 1 for i in range(WIDTH * HEIGHT)]
+
+    @property
+    def payload(self) -> bytes:
+        if self._payload is None:
+            object.__setattr__(self, "_payload", bytes([0x02, *self.dots]))
+        return self._payload
+
+    def step(self, delay: float = 0) -> ProgramStep:
+        return ProgramStep(display_characteristic_uuid, self.payload, delay)
+
+    def invert(self) -> "Frame":
+        return Frame(~self.mask)
+
+    def overlay(self, other: "Frame") -> "Frame":
+        return Frame(self.mask | other.mask)
+
+    def mask_with(self, other: "Frame") -> "Frame":
+        return Frame(self.mask & other.mask)
+
+    def shift(self, dx: int = 0, dy: int = 0) -> "Frame":
+        """Move every dot right by dx and down by dy; dots pushed off the edge are lost."""
+        mask = self.mask
+        if dx >= WIDTH or dx <= -WIDTH or dy >= HEIGHT or dy <= -HEIGHT:
+            return Frame(0)
+        if dx > 0:
+            mask = (mask & ~_columns_from[WIDTH - dx]) << dx
+        elif dx < 0:
+            mask = (mask & _columns_from[-dx]) >> -dx
+        if dy > 0:
+            mask <<= dy * WIDTH
+        elif dy < 0:
+            mask >>= -dy * WIDTH
+        return Frame(mask)
+
+    def blit(self, sprite: "Frame", x: int = 0, y: int = 0) -> "Frame":
+        """Draw a sprite with its top-left corner at (x, y) on top of this frame."""
+        return self.overlay(sprite.shift(x, y))
+
+    __invert__ = invert
+    __or__ = overlay
+    __and__ = mask_with
+
+    def __repr__(self):
+        dots = "".join("#" if dot else "." for dot in self.dots)
+        rows = [dots[row * WIDTH : (row + 1) * WIDTH] for row in range(HEIGHT)]
+        return f"Frame.from_rows({', '.join(map(repr, rows))})"
+
+
+BLANK = Frame(0)
+
+
+def scroll(frame: Frame, dx: int, dy: int, steps: int) -> tuple[Frame, ...]:
+    """The frame moved by (dx, dy) once per step, starting where it is."""
+    return tuple(frame.shift(dx * i, dy * i) for i in range(steps))
+
+
+def marquee(frame: Frame) -> tuple[Frame, ...]:
+    """The frame sliding in from the right and out to the left."""
+    return tuple(frame.shift(dx) for dx in range(WIDTH, -WIDTH - 1, -1))
+
+
+def blink(frame: Frame, times: int) -> tuple[Frame, ...]:
+    return (frame, frame.invert()) * times
+
+
+def animation(frames, delay: float) -> tuple[ProgramStep, ...]:
+    """Program steps showing each frame for ``delay`` seconds.
+
+    The result can be passed to ``stream()`` or added to a compiled program.
+    """
+    return tuple(frame.step(delay) for frame in frames)
@@ -0,0 +1,71 @@
+import asyncio
+import logging
+
+from .commands import CommandQueue
+from .connection import RobotConnection
+from .scheduler import Scheduler
+from .utils import Priority, buttons_characteristic_uuid
+
+logger = logging.getLogger(__name__)
+
+
+async def run_robot(robot):
+    """Run a robot's program straight on the event loop, without a UI.
+
+    If button A or B has been programmed, keep handling button presses
+    until interrupted, like the terminal UI does.
+    """
+    connection = RobotConnection(
+        robot.display_name,
+        streaming=robot.streaming,
+        timeline=robot.timeline,
+        on_status=lambda status: logger.info("%s: %s", robot.display_name, status),
+        backend=robot.backend,
+        stats=robot.stats(),
+        recorder=robot.recorder,
+        telemetry=robot.telemetry(),
+        auto_tune=robot.tune,
+    )
+    await connection.connect()
+    scheduler = Scheduler(
+        connection.executor, connection.clear_program, policy=robot.event_policy
+    )
+    scheduler.start()
+
+    try:
+        if robot.button_a_queue.empty() and robot.button_b_queue.empty():
+            await scheduler.submit(connection.compile(robot.commands), Priority.PROGRAM)
+            return
+
+        button_programs = {}
+        for btn, queue, text in (
+            (1, robot.button_a_queue, "A"),
+            (2, robot.button_b_queue, "B"),
+        ):
+            if queue.empty():
+                queue = CommandQueue(
+                    f"{robot.display_name} button {text.lower()}"
+                ).displayText(text, 1)
+            button_programs[btn] = connection.compile(queue)
+
+        # buttons are live during the main program and preempt it
+        def _on_button(btn: int):
+            program = button_programs.get(btn)
+            if program is not None:
+                scheduler.submit(program)
+
+        await connection.subscribe(buttons_characteristic_uuid, _on_button)
+        await asyncio.wait(
+            {scheduler.submit(connection.compile(robot.commands), Priority.PROGRAM)}
+        )
+        await asyncio.Event().wait()
+    finally:
+        await scheduler.stop()
+        await connection.disconnect()
+
+
+def run(robot):
+    try:
+        asyncio.run(run_robot(robot))
+    except KeyboardInterrupt:
+        pass
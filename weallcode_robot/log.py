@@ -0,0 +1,51 @@
+import atexit
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+
+_listener = None
+
+
+def enable_logging(
+    filename: str = "wac.log", level: int = logging.DEBUG
+) -> QueueListener:
+    """Log the library's messages to a file from a background thread.
+
+    Records are put on an in-memory queue by the caller and written to disk
+    by a listener thread, so logging never blocks the event loop on file I/O.
+    Calling it again replaces the previous configuration.
+    """
+    global _listener
+    disable_logging()
+
+    records = queue.SimpleQueue()
+    handler = logging.FileHandler(filename, encoding="utf-8")
+    handler.setFormatter(
+        logging.Formatter("%(asctime)s %(name)s %(levelname)s %(message)s")
+    )
+
+    logger = logging.getLogger("weallcode_robot")
+    logger.setLevel(level)
+    logger.addHandler(QueueHandler(records))
+
+    _listener = QueueListener(records, handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(disable_logging)
+    return _listener
+
+
+def disable_logging():
+    """Stop the background listener, flushing anything still queued."""
+    global _listener
+    if _listener is None:
+        return
+
+    logger = logging.getLogger("weallcode_robot")
+    for handler in list(logger.handlers):
+        if isinstance(handler, QueueHandler):
+            logger.removeHandler(handler)
+
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
@@ -0,0 +1,133 @@
+"""An asyncio event loop that runs in a background thread, shared by every robot.
+
+Scripts call ``Robot`` methods from the main thread or their own worker
+threads. Connections and programs run on this loop, so asyncio objects
+are only ever used from one thread and several robots run side by side.
+"""
+
+import asyncio
+import atexit
+import concurrent.futures
+import logging
+import threading
+
+from .commands import CommandQueue
+from .utils import PersistentQueue
+
+logger = logging.getLogger(__name__)
+
+
+class LoopThread:
+    """An event loop in a daemon thread, started on first use."""
+
+    def __init__(self, name: str = "weallcode-robot"):
+        self.name = name
+        self.loop = None
+        self._discovery = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def discovery(self):
+        """Robots connecting on this loop find each other in one shared scan."""
+        if self._discovery is None:
+            # bleak is only imported once something connects
+            from .discovery import DiscoveryBatch
+
+            self._discovery = DiscoveryBatch()
+        return self._discovery
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self.loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(
+                target=self._run, name=self.name, daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_forever()
+        finally:
+            tasks = asyncio.all_tasks(self.loop)
+            for task in tasks:
+                task.cancel()
+            self.loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            self.loop.close()
+
+    def submit(self, coro) -> concurrent.futures.Future:
+        """Run a coroutine on the loop; the future can be waited on from any thread."""
+        self.start()
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def stop(self, timeout: float = 5.0):
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        thread.join(timeout)
+        if thread.is_alive():
+            logger.debug("%s did not stop within %.1f s", self.name, timeout)
+
+
+background = LoopThread()
+# registered on import, before any robot, so it runs after their handlers
+atexit.register(background.stop)
+
+
+class SharedQueue(CommandQueue):
+    """A command queue that any thread can add to and read.
+
+    Every change is made straight away under a lock, so puts from several
+    threads never race and each thread sees its own commands at once.
+    Reads need no lock: the queue itself is an immutable value.
+    """
+
+    def __init__(self, name: str, replayed: bool = False):
+        super().__init__(name, replayed)
+        self._lock = threading.Lock()
+
+    def __copy__(self):
+        copied = SharedQueue(self.name, self.replayed)
+        copied.queue, copied._queue = self.queue, self._queue
+        return copied
+
+    def __deepcopy__(self, memo):
+        return self.__copy__()
+
+    def put(self, command):
+        with self._lock:
+            self.queue = self.queue.append(command)
+
+    async def get(self):
+        with self._lock:
+            if not self.queue:
+                raise asyncio.QueueEmpty
+            command, self.queue = self.queue.popleft()
+        return command
+
+    async def clear_immediate(self):
+        with self._lock:
+            self.queue = PersistentQueue()
+        self.clear()
+        return self
+
+    def restore_sync(self):
+        with self._lock:
+            if self._queue is not None:
+                self.queue = self._queue
+
+    def take(self) -> CommandQueue:
+        """Move the queued commands into a new queue, leaving this one empty."""
+        taken = CommandQueue(self.name)
+        with self._lock:
+            taken.queue, self.queue = self.queue, PersistentQueue()
+        return taken
@@ -0,0 +1,104 @@
+import logging
+import math
+import statistics
+import time
+
+from .executor import ProgramExecutor
+from .transport import streamable_characteristics
+from .utils import characteristic_names
+
+logger = logging.getLogger(__name__)
+
+# shortest BLE connection interval; at most one packet per interval is assumed
+connection_interval = 0.0075
+# links slower than this get streaming and coarser step spacing
+slow_rtt = 0.05
+
+
+class LinkProfile:
+    """What a probe measured about one robot's link, and the settings chosen."""
+
+    def __init__(self, rtt: dict[str, float], mtu: int):
+        self.rtt = rtt
+        self.mtu = mtu
+
+        # the display's payload takes several packets at the default MTU, so
+        # only the single-packet setpoints say how fast steps can go out
+        setpoints = [
+            rtt[char_uuid]
+            for char_uuid in streamable_characteristics
+            if char_uuid in rtt
+        ]
+        self.setpoint_rtt = worst = max(setpoints or rtt.values(), default=0.0)
+        self.slow = worst > slow_rtt
+        # keep about one round trip's worth of writes in flight
+        self.window = min(32, max(2, math.ceil(worst / connection_interval)))
+        self.streaming = self.slow
+        # steps closer together than a round trip can't be delivered in time
+        self.min_interval = worst if self.slow else 0.0
+        # anything bigger needs an acknowledged (long) write
+        self.max_unacknowledged = max(1, mtu - 3)
+
+    def summary(self) -> str:
+        rtt = self.setpoint_rtt * 1000
+        parts = [f"rtt {rtt:.0f} ms", f"mtu {self.mtu}", f"window {self.window}"]
+        if self.streaming:
+            parts.append("streaming")
+        if self.slow:
+            parts.append("slow link")
+        return ", ".join(parts)
+
+    def as_dict(self) -> dict:
+        return {
+            "rtt": {
+                characteristic_names.get(char_uuid, char_uuid): seconds
+                for char_uuid, seconds in self.rtt.items()
+            },
+            "mtu": self.mtu,
+            "slow": self.slow,
+            "window": self.window,
+            "streaming": self.streaming,
+            "min_interval": self.min_interval,
+            "max_unacknowledged": self.max_unacknowledged,
+        }
+
+
+async def probe(
+    executor: ProgramExecutor, payloads: dict[str, bytes], samples: int = 3
+) -> LinkProfile:
+    """Time acknowledged writes of ``payloads`` to measure the link.
+
+    The payloads should leave the robot as it is, e.g. the clear program
+    right after connecting. The executor's shadow is updated to match.
+    """
+    transport = executor.transport
+    rtt = {}
+    for char_uuid, payload in payloads.items():
+        if char_uuid not in transport.characteristics:
+            continue
+        char = transport.characteristics[char_uuid]
+        timings = []
+        for _ in range(samples):
+            start = time.perf_counter()
+            await transport.client.write_gatt_char(char, payload, response=True)
+            timings.append(time.perf_counter() - start)
+        rtt[char_uuid] = statistics.median(timings)
+        executor.shadow[char_uuid] = payload
+
+    mtu = getattr(transport.client, "mtu_size", 23)
+    profile = LinkProfile(rtt, mtu)
+    logger.debug("link profile: %s", profile.summary())
+    return profile
+
+
+def apply(executor: ProgramExecutor, profile: LinkProfile, streaming: bool = False):
+    """Tune an executor and its transport to a measured link.
+
+    Streaming stays on if it was asked for.
+    """
+    transport = executor.transport
+    transport.window = profile.window
+    transport.streaming = streaming or profile.streaming
+    transport.max_unacknowledged = profile.max_unacknowledged
+    executor.min_interval = profile.min_interval
+    executor.stats.link = profile
@@ -0,0 +1,199 @@
+"""Save compiled programs to disk and load them without rebuilding them.
+
+File layout::
+
+    header      b"WACP", version
+    table       characteristic count (uint8), 16 bytes per UUID
+    payloads    count (uint32), then length (uint16) and bytes for each
+    steps       count (uint32), then per step: characteristic index
+                (uint8, 255 for a wait), payload index (uint16), delay (float64)
+
+Identical payloads are stored once. Steps have a fixed size, so a loaded
+``PackedProgram`` decodes a step only when the executor reaches it and no
+command objects are created at all. Loads are cached by path, size and
+modification time.
+
+    python -m weallcode_robot.program_file dance.wacp ROBOT [--simulate]
+"""
+
+import argparse
+import asyncio
+import os
+import struct
+import uuid
+
+from .commands import CommandQueue, CommandStream, ProgramStep
+
+MAGIC = b"WACP"
+VERSION = 1
+
+_header = struct.Struct("<4sB")
+_count = struct.Struct("<I")
+_length = struct.Struct("<H")
+_step = struct.Struct("<BHd")
+_wait = 0xFF
+_max_payloads = 0x10000  # payload indexes are uint16
+
+_cache = {}
+
+
+class ProgramFormatError(Exception):
+    pass
+
+
+class PackedProgram:
+    """A compiled program decoded from its packed form one step at a time."""
+
+    def __init__(self, data: bytes, offset: int, count: int, characteristics, payloads):
+        self._data = data
+        self._offset = offset
+        self._count = count
+        self.characteristics = characteristics
+        self.payloads = payloads
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return (self[i] for i in range(*index.indices(self._count)))
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("step index out of range")
+
+        char, payload, delay = _step.unpack_from(
+            self._data, self._offset + index * _step.size
+        )
+        if char == _wait:
+            return ProgramStep(None, None, delay)
+        return ProgramStep(self.characteristics[char], self.payloads[payload], delay)
+
+    def __iter__(self):
+        return self[:]
+
+
+def dumps(program) -> bytes:
+    """Pack a compiled program, or a CommandQueue which is compiled first."""
+    if isinstance(program, CommandQueue):
+        program = program.compile()
+
+    characteristics = {}
+    payloads = {}
+    steps = []
+    for step in program:
+        if isinstance(step, CommandStream):
+            raise ValueError("programs with streams can't be saved")
+        if step.char_uuid is None:
+            steps.append(_step.pack(_wait, 0, step.delay))
+            continue
+        char = characteristics.setdefault(step.char_uuid, len(characteristics))
+        payload = payloads.setdefault(bytes(step.payload), len(payloads))
+        if payload >= _max_payloads:
+            raise ValueError(
+                f"too many distinct payloads to pack (at most {_max_payloads})"
+            )
+        steps.append(_step.pack(char, payload, step.delay))
+
+    if len(characteristics) >= _wait:
+        raise ValueError("too many characteristics to pack")
+
+    parts = [_header.pack(MAGIC, VERSION), bytes([len(characteristics)])]
+    parts += [uuid.UUID(char_uuid).bytes for char_uuid in characteristics]
+    parts.append(_count.pack(len(payloads)))
+    for payload in payloads:
+        parts += [_length.pack(len(payload)), payload]
+    parts.append(_count.pack(len(steps)))
+    parts += steps
+    return b"".join(parts)
+
+
+def loads(data: bytes) -> PackedProgram:
+    try:
+        magic, version = _header.unpack_from(data)
+        if magic != MAGIC:
+            raise ProgramFormatError("not a packed program")
+        if version != VERSION:
+            raise ProgramFormatError(f"unsupported version {version}")
+        offset = _header.size
+
+        characteristics = []
+        for _ in range(data[offset]):
+            raw = data[offset + 1 : offset + 17]
+            characteristics.append(str(uuid.UUID(bytes=raw)).upper())
+            offset += 16
+        offset += 1
+
+        (count,) = _count.unpack_from(data, offset)
+        offset += _count.size
+        payloads = []
+        for _ in range(count):
+            (length,) = _length.unpack_from(data, offset)
+            offset += _length.size
+            payloads.append(data[offset : offset + length])
+            offset += length
+
+        (count,) = _count.unpack_from(data, offset)
+        offset += _count.size
+    except (struct.error, IndexError, ValueError) as e:
+        raise ProgramFormatError(f"corrupt packed program: {e}") from None
+
+    if len(data) < offset + count * _step.size:
+        raise ProgramFormatError("packed program is truncated")
+    return PackedProgram(data, offset, count, characteristics, payloads)
+
+
+def dump(program, path):
+    with open(path, "wb") as f:
+        f.write(dumps(program))
+
+
+def load(path) -> PackedProgram:
+    """Load a packed program, reusing the last load if the file is unchanged."""
+    path = os.path.realpath(path)
+    stat = os.stat(path)
+    key = (stat.st_size, stat.st_mtime_ns)
+
+    cached = _cache.get(path)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    with open(path, "rb") as f:
+        program = loads(f.read())
+    _cache[path] = (key, program)
+    return program
+
+
+async def _run_on(path, name: str, simulate: bool):
+    from .connection import RobotConnection
+
+    backend = None
+    if simulate:
+        from .simulator import Simulator
+
+        backend = Simulator()
+        backend.add_robot(name)
+
+    connection = RobotConnection(name, backend=backend)
+    await connection.connect()
+    try:
+        await connection.run(load(path))
+        await connection.run(connection.clear_program)
+    finally:
+        await connection.disconnect()
+    print(connection.stats.summary())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a packed program.")
+    parser.add_argument("path", help="packed program file")
+    parser.add_argument("robot", help="name of the robot to run it on")
+    parser.add_argument(
+        "--simulate", action="store_true", help="run it on a simulated robot"
+    )
+    args = parser.parse_args()
+    asyncio.run(_run_on(args.path, args.robot, args.simulate))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""Record the writes sent to a robot and replay them later.
+
+A recording is a small header followed by one record per write::
+
+    header  b"WACR", version, start time (unix), characteristic count,
+            16 bytes per characteristic UUID
+    record  microseconds since the previous write (uint32),
+            characteristic index (uint8), payload length (uint16), payload
+
+Gaps longer than a uint32 of microseconds (about 71 minutes) are
+shortened to that. Recordings are read through ``mmap`` one record at a
+time, so replaying a long session doesn't load it into memory.
+
+    python -m weallcode_robot.recording session.wacr ROBOT [--speed 2] [--simulate]
+"""
+
+import argparse
+import asyncio
+import mmap
+import struct
+import time
+import uuid
+from typing import NamedTuple
+
+from .commands import CommandStream, ProgramStep
+from .utils import command_characteristics
+
+MAGIC = b"WACR"
+VERSION = 1
+
+_header = struct.Struct("<4sBdB")
+_record = struct.Struct("<IBH")
+_max_gap = 0xFFFFFFFF
+
+
+class RecordingFormatError(Exception):
+    pass
+
+
+class RecordedWrite(NamedTuple):
+    timestamp: float  # seconds since the first write
+    char_uuid: str
+    payload: bytes
+
+
+class Recorder:
+    """Appends every write an executor makes to a recording file.
+
+    Set it as ``executor.recorder``, or pass ``record=path`` to ``Robot``.
+    Writes are buffered and flushed on ``close()``.
+    """
+
+    def __init__(self, path, characteristics=command_characteristics):
+        self.path = path
+        self.characteristics = [char_uuid for _, char_uuid in characteristics]
+        self._index = {char_uuid: i for i, char_uuid in enumerate(self.characteristics)}
+        self._last = None
+        self.count = 0
+
+        self._file = open(path, "wb")
+        self._file.write(
+            _header.pack(MAGIC, VERSION, time.time(), len(self.characteristics))
+        )
+        for char_uuid in self.characteristics:
+            self._file.write(uuid.UUID(char_uuid).bytes)
+
+    def record(self, char_uuid: str, payload: bytes):
+        now = time.monotonic()
+        gap = 0 if self._last is None else round((now - self._last) * 1_000_000)
+        self._last = now
+
+        self._file.write(
+            _record.pack(min(gap, _max_gap), self._index[char_uuid], len(payload))
+        )
+        self._file.write(payload)
+        self.count += 1
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Recording:
+    """A recording file, read lazily through ``mmap``."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            try:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise RecordingFormatError(f"{path} is empty") from None
+
+        if len(self._map) < _header.size:
+            raise RecordingFormatError(f"{path} is too short to be a recording")
+        magic, version, self.started, count = _header.unpack_from(self._map)
+        if magic != MAGIC:
+            raise RecordingFormatError(f"{path} is not a recording")
+        if version != VERSION:
+            raise RecordingFormatError(f"{path} has unsupported version {version}")
+
+        offset = _header.size
+        self.characteristics = []
+        for _ in range(count):
+            raw = self._map[offset : offset + 16]
+            self.characteristics.append(str(uuid.UUID(bytes=raw)).upper())
+            offset += 16
+        self._start = offset
+
+    def __iter__(self):
+        data = self._map
+        offset = self._start
+        end = len(data)
+        timestamp = 0.0
+
+        while offset + _record.size <= end:
+            gap, index, size = _record.unpack_from(data, offset)
+            offset += _record.size
+            if offset + size > end:
+                break  # the recorder was cut off mid-write
+            timestamp += gap / 1_000_000
+            yield RecordedWrite(
+                timestamp, self.characteristics[index], data[offset : offset + size]
+            )
+            offset += size
+
+    def steps(self, speed: float = 1.0):
+        """The recorded writes as program steps with their original spacing."""
+        previous = None
+        for write in self:
+            if previous is not None:
+                delay = (write.timestamp - previous.timestamp) / speed
+                yield ProgramStep(previous.char_uuid, previous.payload, delay)
+            previous = write
+        if previous is not None:
+            yield ProgramStep(previous.char_uuid, previous.payload, 0)
+
+    def program(self, speed: float = 1.0) -> tuple[CommandStream]:
+        """A program that replays the recording, streamed as it runs."""
+        return (CommandStream(self.steps(speed)),)
+
+    def close(self):
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+async def replay(path, executor, speed: float = 1.0):
+    """Send a recording through an executor with its original timing."""
+    with Recording(path) as recording:
+        return await executor.run_timeline(recording.program(speed))
+
+
+async def _replay_to(path, name: str, speed: float, simulate: bool):
+    from .connection import RobotConnection
+
+    backend = None
+    if simulate:
+        from .simulator import Simulator
+
+        backend = Simulator()
+        backend.add_robot(name)
+
+    connection = RobotConnection(name, backend=backend)
+    await connection.connect()
+    try:
+        await replay(path, connection.executor, speed)
+    finally:
+        await connection.disconnect()
+    print(connection.stats.summary())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded session.")
+    parser.add_argument("path", help="recording file")
+    parser.add_argument("robot", help="name of the robot to replay it on")
+    parser.add_argument("--speed", type=float, default=1.0, help="playback speed")
+    parser.add_argument(
+        "--simulate", action="store_true", help="replay on a simulated robot"
+    )
+    args = parser.parse_args()
+    asyncio.run(_replay_to(args.path, args.robot, args.speed, args.simulate))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,12 @@
 import time
 import asyncio
+import concurrent.futures
 import logging
 import atexit
-from queue import Queue
+import sys
+import threading
 from datetime import datetime, timedelta
-
-from bleak import BleakClient, BleakScanner
-from bleak.backends.characteristic import BleakGATTCharacteristic
+from typing import NamedTuple
 
 from .commands import (
     CommandQueue,
@@ -18,31 +18,93 @@ from .commands import (
     WaitCommand,
 )
 
-from .robot_ui import RobotUI
+from .loop import SharedQueue, background
+from .stats import RobotStats
+from .telemetry import Telemetry
 from .utils import (
     RobotState, 
     DynamicObject,
+    EventPolicy,
+    Priority,
     device_name_map, 
-    buttons_characteristic_uuid
+    buttons_characteristic_uuid,
+    debug_requested,
+    headless_requested,
 )
 
+logger = logging.getLogger(__name__)
+
+
+class RunResult(NamedTuple):
+    name: str
+    steps: int
+    started: float  # unix time the program started
+    elapsed: float  # seconds it took
+    writes: int
+
+
 class Robot(CommandQueue):
-    def __init__(self, name, debug=False):
+    def __init__(
+        self,
+        name,
+        debug=False,
+        streaming=False,
+        timeline=False,
+        headless=None,
+        backend=None,
+        event_policy=EventPolicy.QUEUE,
+        hold_rate=20.0,
+        hold_timeout=0.5,
+        record=None,
+        tune=False,
+    ):
         
+        if debug or debug_requested():
+            from .log import enable_logging
+
+            enable_logging()
+
         self.display_name = name
+        self.streaming = streaming
+        self.timeline = timeline
+        self.backend = backend
+        self.event_policy = event_policy
+        self.hold_rate = hold_rate
+        self.hold_timeout = hold_timeout
+        self.tune = tune
+        self.recorder = None
+        if record is not None:
+            from .recording import Recorder
+
+            self.recorder = Recorder(record)
+        self._stats = RobotStats()
+        self._telemetry = Telemetry()
         if self.display_name not in device_name_map:
             self.name = self.display_name
         else:
             self.name = device_name_map[self.display_name]
 
-        self.ui = RobotUI(robot=self)
+        # headless runs skip the terminal UI and never import textual
+        self.headless = headless_requested() if headless is None else headless
+        self._ui = None
         
         self.command_tasks = None
         self.last_key_event = datetime.now()
         
-        self.main_queue = CommandQueue(f'{self.display_name} main')
-        self.button_a_queue = CommandQueue(f'{self.display_name} button a')
-        self.button_b_queue = CommandQueue(f'{self.display_name} button b')
+        # any thread may add commands; runs happen on the background loop
+        self.loop = background
+        self.main_queue = SharedQueue(f'{self.display_name} main')
+        self.button_a_queue = SharedQueue(
+            f'{self.display_name} button a', replayed=True)
+        self.button_b_queue = SharedQueue(
+            f'{self.display_name} button b', replayed=True)
+        self._connection = None
+        self._scheduler = None
+        self._connecting = None
+        self._runs = set()
+        self._runs_lock = threading.Lock()
+        self._errors = []
+        self._ran = False
         self.commands = self.main_queue
 
         # map commands
@@ -55,6 +117,7 @@ class Robot(CommandQueue):
         self.clearDisplay = self.main_queue.clearDisplay
         self.buzz = self.main_queue.buzz
         self.clear = self.main_queue.clear
+        self.stream = self.main_queue.stream
 
         self.buttonA = DynamicObject()
         self.buttonA.led = self.button_a_queue.led
@@ -66,6 +129,7 @@ class Robot(CommandQueue):
         self.buttonA.clearDisplay = self.button_a_queue.clearDisplay
         self.buttonA.buzz = self.button_a_queue.buzz
         self.buttonA.clear = self.button_a_queue.clear
+        self.buttonA.stream = self.button_a_queue.stream
 
         self.buttonB = DynamicObject()
         self.buttonB.led = self.button_b_queue.led
@@ -77,18 +141,205 @@ class Robot(CommandQueue):
         self.buttonB.clearDisplay = self.button_b_queue.clearDisplay
         self.buttonB.buzz = self.button_b_queue.buzz
         self.buttonB.clear = self.button_b_queue.clear
+        self.buttonB.stream = self.button_b_queue.stream
         
-        atexit.register(self.ui.run)
+        # atexit runs handlers in reverse, so the recording is closed last
+        if self.recorder is not None:
+            atexit.register(self.recorder.close)
+        atexit.register(self._at_exit)
+
+    @property
+    def ui(self):
+        """The terminal UI, built on first use.
+
+        Scripts that only use ``run()`` never import Textual.
+        """
+        if self._ui is None and not self.headless:
+            from .robot_ui import RobotUI
+
+            self._ui = RobotUI(robot=self)
+        return self._ui
+
+    def stats(self) -> RobotStats:
+        """Write counts, latencies and lateness for this robot so far."""
+        return self._stats
+
+    def telemetry(self) -> Telemetry:
+        """Recent button presses and other notifications from the robot."""
+        return self._telemetry
+
+    def run_headless(self):
+        from .headless import run
+
+        run(self)
+
+    def run(self) -> concurrent.futures.Future:
+        """Start running the commands queued so far and return straight away.
+
+        The program runs on the background loop; the returned future
+        resolves to a ``RunResult`` once it is done. Commands added after
+        this call make up the next ``run()``, which reconnects first if the
+        link has dropped. Runs on one robot follow each other, runs on
+        different robots go side by side, and buttons A and B stay live
+        while connected. Once ``run()`` has been used the
+        program is not run again on exit, nor is the terminal UI shown;
+        exiting waits for unfinished runs and disconnects.
+        """
+        self._ran = True
+        future = self.loop.submit(self._run(self.main_queue.take()))
+        with self._runs_lock:
+            self._runs.add(future)
+        future.add_done_callback(self._finished)
+        return future
+
+    def close(self, timeout: float = None):
+        """Wait for every run to finish, then disconnect.
+
+        Raises the error of the first run that failed; any others are
+        logged.
+        """
+        with self._runs_lock:
+            runs = list(self._runs)
+        concurrent.futures.wait(runs, timeout)
+        if self.loop.running:
+            self.loop.submit(self._disconnect()).result(timeout)
+
+        with self._runs_lock:
+            errors, self._errors = self._errors, []
+        for error in errors[1:]:
+            logger.warning("%s: run failed: %r", self.display_name, error)
+        if errors:
+            raise errors[0]
+
+    def _at_exit(self):
+        if self._ran:
+            try:
+                self.close()
+            except Exception as e:
+                print(f"{self.display_name}: {e}", file=sys.stderr)
+            return
+        if self.headless:
+            self.run_headless()
+        else:
+            self.ui.run()
+
+    def _finished(self, future: concurrent.futures.Future):
+        with self._runs_lock:
+            self._runs.discard(future)
+            if not future.cancelled() and future.exception() is not None:
+                self._errors.append(future.exception())
+
+    async def _run(self, commands: CommandQueue) -> RunResult:
+        connection = await self._connect()
+        program = connection.compile(commands)
+
+        writes = sum(char.writes for char in self._stats.characteristics.values())
+        started, start = time.time(), time.monotonic()
+        await self._scheduler.submit(program, Priority.PROGRAM)
+        return RunResult(
+            self.display_name,
+            len(program),
+            started,
+            time.monotonic() - start,
+            sum(char.writes for char in self._stats.characteristics.values()) - writes,
+        )
+
+    async def _connect(self):
+        if self._connection is not None and not self._connection.is_connected:
+            # the link dropped since the last run; swapped out here, before
+            # any await, so concurrent runs reconnect only once
+            logger.info("%s: link lost, reconnecting", self.display_name)
+            stale, self._scheduler = self._scheduler, None
+            self._connection = None
+            self._connecting = asyncio.ensure_future(self._open(stale))
+        elif self._connecting is None:
+            self._connecting = asyncio.ensure_future(self._open())
+        try:
+            return await asyncio.shield(self._connecting)
+        except Exception:
+            self._connecting = None
+            raise
+
+    async def _open(self, stale=None):
+        from .connection import RobotConnection
+        from .scheduler import Scheduler
+
+        if stale is not None:
+            await stale.stop()
+
+        connection = RobotConnection(
+            self.display_name,
+            streaming=self.streaming,
+            timeline=self.timeline,
+            on_status=lambda status: logger.info("%s: %s", self.display_name, status),
+            backend=self.backend,
+            stats=self._stats,
+            recorder=self.recorder,
+            telemetry=self._telemetry,
+            auto_tune=self.tune,
+            discovery=self.loop.discovery,
+        )
+        await connection.connect()
+        self._connection = connection
+        self._scheduler = Scheduler(
+            connection.executor, connection.clear_program, policy=self.event_policy
+        )
+        self._scheduler.start()
+
+        button_programs = {
+            btn: connection.compile(queue)
+            for btn, queue in ((1, self.button_a_queue), (2, self.button_b_queue))
+            if not queue.empty()
+        }
+        if button_programs:
+            def _on_button(btn: int):
+                program = button_programs.get(btn)
+                if program is not None:
+                    self._scheduler.submit(program)
+
+            await connection.subscribe(buttons_characteristic_uuid, _on_button)
+        return connection
+
+    async def _disconnect(self):
+        if self._scheduler is not None:
+            await self._scheduler.stop()
+        if self._connection is not None:
+            await self._connection.disconnect()
+        self._connection = self._scheduler = self._connecting = None
     
     def setKeyBinding(self, key) -> CommandQueue:
-        valid_keys = {
-            'a', 'b', 'c', 'd', 'e', 'f', 'g', 'h', 'i', 'j', 'k', 'l', 'm',
-            'n', 'o', 'p', 'q', 'r', 's', 't', 'u', 'v', 'w', 'x', 'y', 'z',
-            '1', '2', '3', '4', '5', '6', '7', '8', '9', '0', 'space', 'enter',
-            'up', 'down', 'left', 'right'
-        }
+        _check_key(key)
 
-        if key not in valid_keys:
-            raise ValueError(f"Invalid key {key}, must be in set {valid_keys}")
+        if self.headless:
+            logger.warning("key binding %s is ignored when running headless", key)
+            return CommandQueue(f'{self.display_name}-{key}', replayed=True)
             
         return self.ui.bind(key)
+
+    def setHoldBinding(self, key) -> CommandQueue:
+        """Drive while a key is held down.
+
+        The LED and motor values the returned queue ends on are sent at
+        ``hold_rate`` per second for as long as the key repeats, and the
+        motors stop ``hold_timeout`` seconds after it is let go.
+        """
+        _check_key(key)
+
+        if self.headless:
+            logger.warning("hold binding %s is ignored when running headless", key)
+            return CommandQueue(f'{self.display_name}-hold-{key}', replayed=True)
+
+        return self.ui.bind_hold(key)
+
+
+valid_keys = {
+    'a', 'b', 'c', 'd', 'e', 'f', 'g', 'h', 'i', 'j', 'k', 'l', 'm',
+    'n', 'o', 'p', 'q', 'r', 's', 't', 'u', 'v', 'w', 'x', 'y', 'z',
+    '1', '2', '3', '4', '5', '6', '7', '8', '9', '0', 'space', 'enter',
+    'up', 'down', 'left', 'right'
+}
+
+
+def _check_key(key):
+    if key not in valid_keys:
+        raise ValueError(f"Invalid key {key}, must be in set {valid_keys}")
@@ -1,4 +1,4 @@
-import copy
+import asyncio
 
 from textual.app import App, ComposeResult
 from textual.widgets import Header, Footer, Static
@@ -6,12 +6,15 @@ from textual.widget import Widget
 from textual import events, work
 from textual.reactive import reactive
 
-from bleak import BleakClient, BleakScanner
-from bleak.backends.characteristic import BleakGATTCharacteristic
-
+from .characteristics import MissingCharacteristicError
+from .connection import RobotConnection, RobotNotFoundError
+from .control import ContinuousControl, setpoints
+from .scheduler import Scheduler
+from .transport import streamable_characteristics
 from .utils import (
     RobotState, 
     DynamicObject,
+    Priority,
     device_name_map, 
     buttons_characteristic_uuid
 )
@@ -39,36 +42,74 @@ class RobotStatus(Widget):
         return f"Status: {self.status}"
 
 
+class StatsPanel(Widget):
+    """A widget to display live write statistics."""
+
+    summary = reactive("")
+
+    def render(self) -> str:
+        return self.summary
+
+
 class RobotUI(App):
     BINDINGS = [
-        ("escape", "quit", "Quit Application")
+        ("escape", "quit", "Quit Application"),
+        ("backspace", "emergency_stop", "Stop Robot"),
     ]
 
     def __init__(self, robot, **kwargs):
         super().__init__(**kwargs)
         self.robot = robot
-        self.running = 0
+        self.scheduler = None
+        self.control = None
         
         self.key_commands = {}
+        self.key_programs = {}
+        self.hold_commands = {}
+        self.hold_setpoints = {}
+
+        self.connection = RobotConnection(
+            robot.display_name,
+            streaming=robot.streaming,
+            timeline=robot.timeline,
+            on_status=self.update_status,
+            backend=robot.backend,
+            stats=robot.stats(),
+            recorder=robot.recorder,
+            telemetry=robot.telemetry(),
+            auto_tune=robot.tune,
+        )
 
     def compose(self) -> ComposeResult:
         """Create child widgets for the app."""
         yield Header(name=f"WeAllCode: {self.robot.display_name}")
         yield Footer()
         yield RobotStatus()
+        yield StatsPanel()
 
     def on_mount(self) -> None:
+        self.set_interval(0.5, self.update_stats)
         self.run_worker(self._connect_and_run())
 
+    def update_stats(self) -> None:
+        summary = self.robot.stats().summary()
+        telemetry = self.robot.telemetry().summary()
+        if telemetry:
+            summary = f"{summary} | {telemetry}"
+        self.query_one(StatsPanel).summary = summary
+
     def on_key(self, event: events.Key) -> None:
-        if event.key in self.key_commands:
+        if event.key in self.hold_setpoints:
+            self.control.hold(self.hold_setpoints[event.key])
+        elif event.key in self.key_programs:
             self.update_status(f"running key {event.key} ...")
-            commands = copy.deepcopy(self.key_commands[event.key]).clear().clearDisplay()
-            self.run_worker(self.execute(commands))
-
+            self.run_worker(self.execute(self.key_programs[event.key]))
 
-    def execute(self, command):
-        self.run_worker(command)
+    def action_emergency_stop(self) -> None:
+        if self.scheduler is not None:
+            self.update_status('stopped')
+            self.control.release()
+            self.scheduler.emergency_stop()
 
     def action_quit(self) -> None:
         self.exit()
@@ -77,77 +118,87 @@ class RobotUI(App):
         self.query_one(RobotStatus).status = status
 
     def bind(self, key) -> CommandQueue:
-        self.key_commands[key] = CommandQueue(f'{self.robot.display_name}-{key}')
+        self.key_commands[key] = CommandQueue(f'{self.robot.display_name}-{key}', replayed=True)
         return self.key_commands[key]
 
-    async def _connect_and_run(self):
-        self.update_status(f'scanning for {self.robot.display_name} ...')
-        device = await BleakScanner.find_device_by_name(self.robot.name, timeout=10.0)
+    def bind_hold(self, key) -> CommandQueue:
+        self.hold_commands[key] = CommandQueue(f'{self.robot.display_name}-hold-{key}', replayed=True)
+        return self.hold_commands[key]
 
-        self.update_status(f'connecting to {self.robot.display_name} ...')
+    def compile(self, commands: CommandQueue):
+        return self.connection.compile(commands)
 
-        if device is None:
-            self.update_status(f"device {self.robot.name} not found. Quit and try again.")
+    async def _connect_and_run(self):
+        try:
+            await self.connection.connect()
+        except (RobotNotFoundError, MissingCharacteristicError) as e:
+            self.update_status(f"{e} on {self.robot.display_name}. Quit and try again.")
             return
 
-        self.update_status(f"found device {device.name} at {device.address}")
-        logging.debug(f"found device {device.name} at {device.address}")
+        self.client = self.connection.client
+        self.executor = self.connection.executor
+        self.scheduler = Scheduler(
+            self.executor, self.connection.clear_program, policy=self.robot.event_policy
+        )
+        self.scheduler.start()
+        self.control = ContinuousControl(
+            self.executor, rate=self.robot.hold_rate, timeout=self.robot.hold_timeout
+        )
+        self.control.start()
+
+        # encode every program once up front so events replay them directly
+        if self.robot.button_a_queue.empty():
+            button_a_program = self.compile(CommandQueue(f'{self.robot.display_name} button a').displayText("A", 1))
+        else:
+            button_a_program = self.compile(self.robot.button_a_queue)
+
+        if self.robot.button_b_queue.empty():
+            button_b_program = self.compile(CommandQueue(f'{self.robot.display_name} button b').displayText("B", 1))
+        else:
+            button_b_program = self.compile(self.robot.button_b_queue)
 
-        self.client = BleakClient(device)
-        self.update_status('connecting ...')
-        await self.client.connect()
+        self.key_programs = {
+            key: self.compile(commands) for key, commands in self.key_commands.items()
+        }
+        self.hold_setpoints = {
+            key: setpoints(commands.compile(), streamable_characteristics)
+            for key, commands in self.hold_commands.items()
+        }
 
-        def _button_handler_callback(characteristic: BleakGATTCharacteristic, data: bytearray):
-            btn = int(data[0])
+        def _on_button(btn: int):
             if btn == 1:
                 self.update_status('running button a ...')
-                if self.robot.button_a_queue.empty():
-                    commands = CommandQueue(f'{self.robot.display_name} button a').displayText("A", 1).clear().clearDisplay()
-                else:
-                    commands = copy.deepcopy(self.robot.button_a_queue).clear().clearDisplay()
-                self.run_worker(self.execute(commands))
+                self.run_worker(self.execute(button_a_program))
             elif btn == 2:
-                self.update_status('running button a ...')
-                if self.robot.button_b_queue.empty():
-                    commands = CommandQueue(f'{self.robot.display_name} button b').displayText("B", 1).clear().clearDisplay()
-                else:
-                    commands = copy.deepcopy(self.robot.button_b_queue).clear().clearDisplay()
-                self.run_worker(self.execute(commands))
+                self.update_status('running button b ...')
+                self.run_worker(self.execute(button_b_program))
 
-        await self.client.start_notify(buttons_characteristic_uuid, _button_handler_callback)
+        await self.connection.subscribe(buttons_characteristic_uuid, _on_button)
         self.update_status('connected')
 
         self.update_status('running ...')
 
-        commands = copy.deepcopy(self.robot.commands).clear().clearDisplay()
-
-        await self.execute(commands)
+        await self.execute(self.compile(self.robot.commands), Priority.PROGRAM)
 
-        if self.robot.button_a_queue.empty() and self.robot.button_b_queue.empty() and not self.key_commands:
+        if self.robot.button_a_queue.empty() and self.robot.button_b_queue.empty() and not self.key_commands and not self.hold_commands:
             self.exit()
 
-    async def execute(self, commands):     
-        if self.running == 1: return
+    def execute(self, program, priority=Priority.EVENT):
+        # submit straight away so event latency is measured from the event
+        return self._finished(self.scheduler.submit(program, priority))
 
-        self.running = 1
-        while commands.empty() is False:
-            command = await commands.get()
-            # self.update_status(f"executing {command.__class__.__name__} ...")
-            await command.execute(self.client)
+    async def _finished(self, done: asyncio.Future):
+        await asyncio.wait({done})
+        # dropped, replaced or stopped: whatever replaced it sets the status
+        if done.cancelled():
+            return
+        done.result()
 
-        if not self.key_commands and self.robot.button_a_queue.empty() and self.robot.button_b_queue.empty():
+        if self.scheduler.busy:
+            return
+        if not self.key_commands and not self.hold_commands and self.robot.button_a_queue.empty() and self.robot.button_b_queue.empty():
             return
+        elif self.executor.timeline and self.executor.lateness:
+            self.update_status(f'idle (max lateness {max(self.executor.lateness) * 1000:.1f} ms)')
         else:
             self.update_status('idle')
-            self.running = 0
-
-    async def clear(self):
-        self.running = 1
-
-        commands = CommandQueue(f'{self.robot.display_name}-{key}').clear().clearDisplay()
-        while commands.empty() is False:
-            command = await commands.get()
-            await command.execute(self.client)
-
-        self.update_status('idle')
-        self.running = 0
\ No newline at end of file
@@ -0,0 +1,197 @@
+import asyncio
+import logging
+import time
+from collections import deque
+
+from .executor import ProgramExecutor
+from .utils import EventPolicy, Priority
+
+logger = logging.getLogger(__name__)
+
+
+class Job:
+    def __init__(self, program, priority: Priority):
+        self.program = program
+        self.priority = priority
+        self.start = 0
+        self.resume = False
+        self.resumed = False
+        self.preempted = False
+        self.wrote = False
+        self.submitted = time.monotonic()
+        self.future = asyncio.get_running_loop().create_future()
+
+
+class Scheduler:
+    """Runs programs on an executor, most urgent first.
+
+    Work goes into one lane per ``Priority``. Submitting to a more urgent
+    lane than the running program cancels it on the spot, so an event
+    handler or emergency stop reaches the robot after at most one write in
+    flight. A preempted main program is resumed from the step it was on once
+    the events are done; an emergency stop cancels everything.
+
+    ``policy`` decides what happens to an event while another one is
+    running or pending: queue it (up to ``max_pending``), replace the others,
+    or drop it. Time from submission to each event's first write is
+    recorded in ``stats.event_latency``.
+    """
+
+    def __init__(
+        self,
+        executor: ProgramExecutor,
+        stop_program,
+        policy: EventPolicy = EventPolicy.QUEUE,
+        max_pending: int = 8,
+    ):
+        self.executor = executor
+        self.stop_program = stop_program
+        self.policy = policy
+        self.max_pending = max(1, max_pending)
+        self.stats = executor.stats
+
+        self._lanes = {priority: deque() for priority in Priority}
+        self._wakeup = asyncio.Event()
+        self._current = None
+        self._task = None
+        self._worker = None
+
+        executor.on_write = self._on_write
+
+    @property
+    def busy(self) -> bool:
+        return self._current is not None or any(self._lanes.values())
+
+    def start(self):
+        if self._worker is None:
+            self._worker = asyncio.create_task(self._work())
+
+    async def stop(self):
+        for lane in self._lanes.values():
+            while lane:
+                lane.popleft().future.cancel()
+        if self._worker is not None:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
+            self._worker = None
+
+    async def __aenter__(self):
+        self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    def submit(
+        self, program, priority: Priority = Priority.EVENT, policy: EventPolicy = None
+    ) -> asyncio.Future:
+        """Schedule a compiled program; the future resolves when it finishes.
+
+        The future is cancelled if the program is dropped, replaced or
+        stopped before it completes.
+        """
+        if policy is None:
+            policy = self.policy
+        job = Job(program, priority)
+        lane = self._lanes[priority]
+        current = self._current
+
+        replaces = priority is Priority.EMERGENCY or (
+            priority is Priority.EVENT and policy is EventPolicy.REPLACE
+        )
+
+        if priority is Priority.EMERGENCY:
+            for other in self._lanes.values():
+                self._drop_all(other)
+        elif priority is Priority.EVENT:
+            running = current is not None and current.priority is priority
+            if policy is EventPolicy.DROP and (lane or running):
+                self.stats.events_dropped += 1
+                job.future.cancel()
+                return job.future
+            if policy is EventPolicy.REPLACE:
+                self._drop_all(lane)
+            elif len(lane) >= self.max_pending:
+                self._drop(lane.popleft())
+        lane.append(job)
+
+        if current is not None and (
+            priority < current.priority or (replaces and priority == current.priority)
+        ):
+            # a preempted main program picks up where it was, unless stopped
+            if priority is Priority.EMERGENCY:
+                current.resume = False
+            elif not current.preempted:
+                current.resume = current.priority is Priority.PROGRAM
+            if not current.preempted:
+                current.preempted = True
+                self.stats.preemptions += 1
+                self._task.cancel()
+
+        self._wakeup.set()
+        return job.future
+
+    def emergency_stop(self) -> asyncio.Future:
+        """Cancel everything and stop the motors, LED and display."""
+        return self.submit(self.stop_program, Priority.EMERGENCY)
+
+    def _drop(self, job: Job):
+        if job.priority is Priority.EVENT:
+            self.stats.events_dropped += 1
+        job.future.cancel()
+
+    def _drop_all(self, lane: deque):
+        while lane:
+            self._drop(lane.popleft())
+
+    def _on_write(self, char_uuid: str):
+        job = self._current
+        if job is None or job.wrote:
+            return
+        job.wrote = True
+        if job.priority is not Priority.PROGRAM:
+            self.stats.event_latency.observe(time.monotonic() - job.submitted)
+
+    def _next(self) -> Job | None:
+        for lane in self._lanes.values():
+            if lane:
+                return lane.popleft()
+        return None
+
+    async def _work(self):
+        while True:
+            job = self._next()
+            if job is None:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            self._current = job
+            self._task = asyncio.create_task(
+                self.executor.run(job.program, start=job.start, resume=job.resumed)
+            )
+            try:
+                await asyncio.wait({self._task})
+            except asyncio.CancelledError:
+                self._task.cancel()
+                job.future.cancel()
+                raise
+            finally:
+                task, self._current, self._task = self._task, None, None
+
+            if task.cancelled() and job.resume:
+                logger.debug(
+                    "resuming %s at step %d", job.priority.name, self.executor.position
+                )
+                job.resume = job.preempted = False
+                job.resumed = True
+                job.start = self.executor.position
+                self._lanes[job.priority].appendleft(job)
+            elif job.future.done():
+                continue
+            elif task.cancelled():
+                job.future.cancel()
+            elif task.exception() is not None:
+                job.future.set_exception(task.exception())
+            else:
+                job.future.set_result(task.result())
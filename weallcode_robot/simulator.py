@@ -0,0 +1,312 @@
+import asyncio
+import random
+import time
+from types import SimpleNamespace
+from typing import NamedTuple
+
+from bleak.exc import BleakError
+
+from .discovery import AddressCache
+from .utils import buttons_characteristic_uuid, command_characteristics, device_name_map
+
+# not used by the library, which subscribes to the buttons characteristic directly
+buttons_service_uuid = "1A270001-C2ED-4D11-AD1E-FC06D8A02D37"
+
+
+class SimulatedWrite(NamedTuple):
+    timestamp: float  # time.monotonic() when the write reached the robot
+    char_uuid: str
+    payload: bytes
+    response: bool
+    dropped: bool
+
+
+class SimulatedCharacteristic:
+    def __init__(self, uuid: str, service_uuid: str, properties: list[str]):
+        self.uuid = uuid
+        self.service_uuid = service_uuid
+        self.properties = properties
+
+    def __str__(self):
+        return f"{self.uuid} (simulated)"
+
+
+class SimulatedService:
+    def __init__(self, uuid: str):
+        self.uuid = uuid
+        self.characteristics = {}
+
+    def get_characteristic(self, uuid: str) -> SimulatedCharacteristic | None:
+        return self.characteristics.get(uuid.upper())
+
+    def __str__(self):
+        return f"{self.uuid} (simulated)"
+
+
+class SimulatedServices:
+    def __init__(self):
+        self.services = {}
+
+    def add(self, service_uuid: str, char_uuid: str, properties: list[str]):
+        service = self.services.setdefault(service_uuid, SimulatedService(service_uuid))
+        service.characteristics[char_uuid] = SimulatedCharacteristic(
+            char_uuid, service_uuid, properties
+        )
+
+    def get_service(self, uuid: str) -> SimulatedService | None:
+        return self.services.get(uuid.upper())
+
+    def get_characteristic(self, uuid: str) -> SimulatedCharacteristic | None:
+        for service in self.services.values():
+            char = service.get_characteristic(uuid)
+            if char is not None:
+                return char
+        return None
+
+
+class SimulatedRobot:
+    """An in-process robot that records every write it receives.
+
+    Acknowledged writes take ``latency`` plus up to ``jitter`` seconds.
+    Writes without response are queued on the link, one every
+    ``packet_interval`` seconds; once more than ``tx_buffer`` are waiting
+    further ones are dropped, like an overrun radio. Any write is lost with
+    probability ``drop_rate``: acknowledged writes then raise ``BleakError``.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        address: str,
+        latency: float = 0.03,
+        jitter: float = 0.0,
+        packet_interval: float = 0.0075,
+        tx_buffer: int = 16,
+        mtu: int = 23,
+        drop_rate: float = 0.0,
+        seed=None,
+    ):
+        self.name = name
+        self.address = address
+        self.latency = latency
+        self.jitter = jitter
+        self.packet_interval = packet_interval
+        self.tx_buffer = tx_buffer
+        self.mtu = mtu
+        self.drop_rate = drop_rate
+        self.random = random.Random(seed)
+        self.available = True  # whether it advertises and accepts connections
+
+        self.services = SimulatedServices()
+        for service_uuid, char_uuid in command_characteristics:
+            self.services.add(
+                service_uuid, char_uuid, ["read", "write", "write-without-response"]
+            )
+        self.services.add(
+            buttons_service_uuid, buttons_characteristic_uuid, ["read", "notify"]
+        )
+
+        self.writes = []
+        self.clients = []
+        self._link_free_at = 0.0
+
+    def state(self, char_uuid: str) -> bytes | None:
+        """The last payload that reached a characteristic."""
+        for write in reversed(self.writes):
+            if write.char_uuid == char_uuid and not write.dropped:
+                return write.payload
+        return None
+
+    def press_button(self, button: int):
+        """Send a button notification (1 for A, 2 for B) to connected clients."""
+        for client in self.clients:
+            client._notify(buttons_characteristic_uuid, bytearray([button]))
+
+    def drop_connection(self):
+        """Simulate the link going down."""
+        for client in list(self.clients):
+            client._lost()
+
+    def _delay(self) -> float:
+        return self.latency + self.jitter * self.random.random()
+
+    def _dropped(self) -> bool:
+        return self.drop_rate > 0 and self.random.random() < self.drop_rate
+
+    async def write(self, char_uuid: str, payload: bytes, response: bool):
+        now = time.monotonic()
+        start = max(now, self._link_free_at)
+        packets = max(1, -(-len(payload) // (self.mtu - 3)))
+
+        if not response:
+            if len(payload) > self.mtu - 3:
+                raise BleakError(f"{len(payload)} bytes exceeds MTU {self.mtu}")
+
+            queued = (start - now) / self.packet_interval if self.packet_interval else 0
+            dropped = queued > self.tx_buffer or self._dropped()
+            if not dropped:
+                self._link_free_at = start + self.packet_interval
+            self.writes.append(
+                SimulatedWrite(
+                    self._link_free_at, char_uuid, bytes(payload), False, dropped
+                )
+            )
+            await asyncio.sleep(0)
+            return
+
+        done = start + packets * self.packet_interval + self._delay()
+        self._link_free_at = done
+        await asyncio.sleep(done - now)
+
+        dropped = self._dropped()
+        self.writes.append(
+            SimulatedWrite(time.monotonic(), char_uuid, bytes(payload), True, dropped)
+        )
+        if dropped:
+            raise BleakError(f"write to {char_uuid} failed (simulated)")
+
+
+class SimulatedClient:
+    """Stand-in for ``BleakClient`` talking to a ``SimulatedRobot``."""
+
+    def __init__(
+        self, simulator, address_or_device, disconnected_callback=None, **kwargs
+    ):
+        self.simulator = simulator
+        self.address = getattr(address_or_device, "address", address_or_device)
+        self.disconnected_callback = disconnected_callback
+        self.robot = None
+        self._notify_callbacks = {}
+
+    @property
+    def is_connected(self) -> bool:
+        return self.robot is not None
+
+    @property
+    def services(self) -> SimulatedServices:
+        return self.robot.services
+
+    @property
+    def mtu_size(self) -> int:
+        return self.robot.mtu
+
+    async def connect(self, **kwargs):
+        robot = self.simulator.by_address.get(self.address)
+        if robot is None or not robot.available:
+            raise BleakError(f"device with address {self.address} was not found")
+        await asyncio.sleep(robot.latency)
+        self.robot = robot
+        robot.clients.append(self)
+        return True
+
+    async def disconnect(self):
+        if self.robot is not None:
+            self._lost()
+        return True
+
+    async def write_gatt_char(self, char_specifier, data, response: bool = False):
+        if self.robot is None:
+            raise BleakError("not connected")
+        char_uuid = getattr(char_specifier, "uuid", char_specifier).upper()
+        await self.robot.write(char_uuid, data, response)
+
+    async def start_notify(self, char_specifier, callback, **kwargs):
+        char_uuid = getattr(char_specifier, "uuid", char_specifier).upper()
+        self._notify_callbacks[char_uuid] = callback
+
+    async def stop_notify(self, char_specifier):
+        char_uuid = getattr(char_specifier, "uuid", char_specifier).upper()
+        self._notify_callbacks.pop(char_uuid, None)
+
+    def _notify(self, char_uuid: str, data: bytearray):
+        callback = self._notify_callbacks.get(char_uuid)
+        if callback is not None:
+            callback(self.services.get_characteristic(char_uuid), data)
+
+    def _lost(self):
+        if self.robot is None:
+            return
+        self.robot.clients.remove(self)
+        self.robot = None
+        self._notify_callbacks.clear()
+        if self.disconnected_callback is not None:
+            self.disconnected_callback(self)
+
+
+class SimulatedScanner:
+    """Stand-in for ``BleakScanner`` that sees every available simulated robot."""
+
+    def __init__(self, simulator, detection_callback=None, **kwargs):
+        self.simulator = simulator
+        self.detection_callback = detection_callback
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+    async def start(self):
+        for robot in list(self.simulator.robots.values()):
+            if not robot.available:
+                continue
+            await asyncio.sleep(self.simulator.discovery_delay)
+            device = SimpleNamespace(address=robot.address, name=robot.name)
+            advertisement = SimpleNamespace(local_name=robot.name, rssi=-50)
+            if self.detection_callback is not None:
+                self.detection_callback(device, advertisement)
+
+    async def stop(self):
+        pass
+
+
+class MemoryAddressCache(AddressCache):
+    """An address cache that is never read from or written to disk."""
+
+    def __init__(self):
+        super().__init__(path="")
+        self._addresses = {}
+
+    def save(self):
+        pass
+
+
+class Simulator:
+    """A room full of simulated robots.
+
+    Pass it as ``backend`` wherever the library would otherwise use bleak::
+
+        simulator = Simulator(latency=0.01)
+        simulator.add_robot("beep")
+        fleet = Fleet(["beep"], backend=simulator)
+
+    Link settings given here are the defaults for every robot added; they
+    can be overridden per robot. Addresses are cached in memory only.
+    """
+
+    def __init__(self, discovery_delay: float = 0.0, **link):
+        self.discovery_delay = discovery_delay
+        self.link = link
+        self.robots = {}
+        self.by_address = {}
+        self.address_cache = MemoryAddressCache()
+
+    def add_robot(self, name: str, **link) -> SimulatedRobot:
+        name = device_name_map.get(name) or name
+        address = (
+            f"00:00:00:00:{len(self.robots) // 256:02X}:{len(self.robots) % 256:02X}"
+        )
+        robot = SimulatedRobot(name, address, **{**self.link, **link})
+        self.robots[name] = robot
+        self.by_address[address] = robot
+        return robot
+
+    def __getitem__(self, name: str) -> SimulatedRobot:
+        return self.robots[device_name_map.get(name) or name]
+
+    def BleakClient(self, address_or_device, **kwargs) -> SimulatedClient:
+        return SimulatedClient(self, address_or_device, **kwargs)
+
+    def BleakScanner(self, **kwargs) -> SimulatedScanner:
+        return SimulatedScanner(self, **kwargs)
@@ -0,0 +1,204 @@
+import json
+from bisect import bisect_left
+
+from .utils import characteristic_names
+
+# upper bounds in seconds, the last bucket catches everything slower
+latency_buckets = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+class Histogram:
+    def __init__(self, buckets=latency_buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th quantile."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return self.max
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "max": self.max,
+            "buckets": dict(zip([*map(str, self.buckets), "+Inf"], self.counts)),
+        }
+
+
+class CharacteristicStats:
+    def __init__(self):
+        self.writes = 0
+        self.bytes = 0
+        self.latency = Histogram()
+
+    def as_dict(self) -> dict:
+        return {
+            "writes": self.writes,
+            "bytes": self.bytes,
+            "latency": self.latency.as_dict(),
+        }
+
+
+class RobotStats:
+    """Counters for one robot, kept across reconnects."""
+
+    def __init__(self):
+        self.characteristics = {}
+        self.writes_saved = 0
+        self.writes_merged = 0
+        self.queue_depth = 0
+        self.lateness = Histogram()
+        self.event_latency = Histogram()
+        self.events_dropped = 0
+        self.preemptions = 0
+        self.link = None
+
+    def record_write(self, char_uuid: str, size: int, seconds: float):
+        stats = self.characteristics.get(char_uuid)
+        if stats is None:
+            stats = self.characteristics[char_uuid] = CharacteristicStats()
+        stats.writes += 1
+        stats.bytes += size
+        stats.latency.observe(seconds)
+
+    @property
+    def writes(self) -> int:
+        return sum(stats.writes for stats in self.characteristics.values())
+
+    def summary(self) -> str:
+        parts = [
+            f"writes {self.writes} (saved {self.writes_saved + self.writes_merged})"
+        ]
+        if self.link is not None:
+            parts.insert(0, self.link.summary())
+        for char_uuid, stats in self.characteristics.items():
+            name = characteristic_names.get(char_uuid, char_uuid)
+            parts.append(f"{name} p50 {stats.latency.quantile(0.5) * 1000:g} ms")
+        if self.lateness.count:
+            parts.append(f"late max {self.lateness.max * 1000:.1f} ms")
+        if self.event_latency.count:
+            parts.append(f"event p50 {self.event_latency.quantile(0.5) * 1000:g} ms")
+        parts.append(f"queue {self.queue_depth}")
+        return " | ".join(parts)
+
+    def as_dict(self) -> dict:
+        return {
+            "characteristics": {
+                characteristic_names.get(char_uuid, char_uuid): stats.as_dict()
+                for char_uuid, stats in self.characteristics.items()
+            },
+            "writes_saved": self.writes_saved,
+            "writes_merged": self.writes_merged,
+            "queue_depth": self.queue_depth,
+            "lateness": self.lateness.as_dict(),
+            "event_latency": self.event_latency.as_dict(),
+            "events_dropped": self.events_dropped,
+            "preemptions": self.preemptions,
+            "link": self.link.as_dict() if self.link is not None else None,
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.as_dict())
+
+    def to_prometheus(self, robot: str) -> str:
+        return to_prometheus({robot: self})
+
+
+def _histogram_lines(metric: str, labels: str, histogram: Histogram) -> list[str]:
+    lines = []
+    cumulative = 0
+    for bound, count in zip([*map(str, histogram.buckets), "+Inf"], histogram.counts):
+        cumulative += count
+        lines.append(f'{metric}_bucket{{{labels},le="{bound}"}} {cumulative}')
+    lines.append(f"{metric}_sum{{{labels}}} {histogram.sum}")
+    lines.append(f"{metric}_count{{{labels}}} {histogram.count}")
+    return lines
+
+
+def to_prometheus(stats_by_robot: dict[str, RobotStats]) -> str:
+    """Render stats for one or more robots in the Prometheus text format."""
+    metrics = {
+        "writes_total": ("counter", "Writes sent to the robot."),
+        "write_bytes_total": ("counter", "Payload bytes sent to the robot."),
+        "write_latency_seconds": ("histogram", "Time taken by each write."),
+        "writes_saved_total": ("counter", "Writes skipped or merged away."),
+        "queue_depth": ("gauge", "Steps left in the running program."),
+        "wait_lateness_seconds": ("histogram", "How late each step started."),
+        "event_latency_seconds": (
+            "histogram",
+            "Time from an event to its first write.",
+        ),
+        "events_dropped_total": ("counter", "Events dropped before they ran."),
+        "preemptions_total": ("counter", "Programs interrupted by a more urgent one."),
+        "link_rtt_seconds": (
+            "gauge",
+            "Acknowledged write round trip measured at connect.",
+        ),
+    }
+    samples = {metric: [] for metric in metrics}
+
+    for robot, stats in stats_by_robot.items():
+        robot_label = f'robot="{robot}"'
+        for char_uuid, char_stats in stats.characteristics.items():
+            name = characteristic_names.get(char_uuid, char_uuid)
+            labels = f'{robot_label},characteristic="{name}"'
+            samples["writes_total"].append(
+                f"weallcode_robot_writes_total{{{labels}}} {char_stats.writes}"
+            )
+            samples["write_bytes_total"].append(
+                f"weallcode_robot_write_bytes_total{{{labels}}} {char_stats.bytes}"
+            )
+            samples["write_latency_seconds"] += _histogram_lines(
+                "weallcode_robot_write_latency_seconds", labels, char_stats.latency
+            )
+        samples["writes_saved_total"].append(
+            f"weallcode_robot_writes_saved_total{{{robot_label}}} "
+            f"{stats.writes_saved + stats.writes_merged}"
+        )
+        samples["queue_depth"].append(
+            f"weallcode_robot_queue_depth{{{robot_label}}} {stats.queue_depth}"
+        )
+        samples["wait_lateness_seconds"] += _histogram_lines(
+            "weallcode_robot_wait_lateness_seconds", robot_label, stats.lateness
+        )
+        samples["event_latency_seconds"] += _histogram_lines(
+            "weallcode_robot_event_latency_seconds", robot_label, stats.event_latency
+        )
+        samples["events_dropped_total"].append(
+            f"weallcode_robot_events_dropped_total{{{robot_label}}} {stats.events_dropped}"
+        )
+        samples["preemptions_total"].append(
+            f"weallcode_robot_preemptions_total{{{robot_label}}} {stats.preemptions}"
+        )
+        if stats.link is not None:
+            for char_uuid, seconds in stats.link.rtt.items():
+                name = characteristic_names.get(char_uuid, char_uuid)
+                samples["link_rtt_seconds"].append(
+                    f'weallcode_robot_link_rtt_seconds{{{robot_label},characteristic="{name}"}} '
+                    f"{seconds}"
+                )
+
+    lines = []
+    for metric, (kind, help_text) in metrics.items():
+        lines.append(f"# HELP weallcode_robot_{metric} {help_text}")
+        lines.append(f"# TYPE weallcode_robot_{metric} {kind}")
+        lines += samples[metric]
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,146 @@
+import asyncio
+import time
+from array import array
+
+from .utils import characteristic_names
+
+
+def decode_uint(data: bytearray) -> int:
+    """The first 8 bytes of a notification as a little-endian unsigned int."""
+    return int.from_bytes(data[:8], "little")
+
+
+class RingBuffer:
+    """The last ``capacity`` samples of one value, with monotonic timestamps.
+
+    Timestamps and values live in preallocated arrays, so recording a
+    sample never allocates. Every sample gets a sequence number;
+    ``samples(start)`` returns the ones from ``start`` on that are still
+    held.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self.capacity = max(1, capacity)
+        self.timestamps = array("d", bytes(8 * self.capacity))
+        self.values = array("Q", bytes(8 * self.capacity))
+        self.count = 0
+
+    def append(self, value: int, timestamp: float = None):
+        i = self.count % self.capacity
+        self.timestamps[i] = time.monotonic() if timestamp is None else timestamp
+        self.values[i] = value
+        self.count += 1
+
+    def __len__(self) -> int:
+        return min(self.count, self.capacity)
+
+    @property
+    def oldest(self) -> int:
+        """Sequence number of the oldest sample still held."""
+        return max(0, self.count - self.capacity)
+
+    def samples(self, start: int = 0):
+        """``(sequence, timestamp, value)`` for each sample from ``start`` on."""
+        for seq in range(max(start, self.oldest), self.count):
+            i = seq % self.capacity
+            yield seq, self.timestamps[i], self.values[i]
+
+    def __iter__(self):
+        for _, timestamp, value in self.samples():
+            yield timestamp, value
+
+    @property
+    def latest(self) -> tuple[float, int] | None:
+        if not self.count:
+            return None
+        i = (self.count - 1) % self.capacity
+        return self.timestamps[i], self.values[i]
+
+    def rate(self, window: float = 1.0) -> float:
+        """Samples per second over the last ``window`` seconds."""
+        since = time.monotonic() - window
+        recent = 0
+        for seq in range(self.count - 1, self.oldest - 1, -1):
+            if self.timestamps[seq % self.capacity] < since:
+                break
+            recent += 1
+        return recent / window
+
+
+class Telemetry:
+    """Notifications from a robot, kept in one ring buffer per characteristic.
+
+    ``callback()`` makes a notify handler that only decodes the value,
+    stores it and wakes any waiting ``stream()``, so a burst of
+    notifications doesn't hold up the executor. Listeners added with
+    ``listen()`` are called with each value as it arrives. Buffers persist
+    across reconnects.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self.capacity = capacity
+        self.buffers = {}
+        self.overruns = 0
+        self._listeners = {}
+        self._changed = {}
+
+    def buffer(self, char_uuid: str) -> RingBuffer:
+        buffer = self.buffers.get(char_uuid)
+        if buffer is None:
+            buffer = self.buffers[char_uuid] = RingBuffer(self.capacity)
+            self._changed[char_uuid] = asyncio.Event()
+        return buffer
+
+    def listen(self, char_uuid: str, listener):
+        self.buffer(char_uuid)
+        self._listeners.setdefault(char_uuid, []).append(listener)
+
+    def record(self, char_uuid: str, value: int):
+        self.buffer(char_uuid).append(value)
+        self._changed[char_uuid].set()
+        for listener in self._listeners.get(char_uuid, ()):
+            listener(value)
+
+    def callback(self, char_uuid: str, decode=decode_uint):
+        """A notify callback for bleak's ``start_notify``."""
+        self.buffer(char_uuid)
+
+        def _notified(characteristic, data: bytearray):
+            self.record(char_uuid, decode(data))
+
+        return _notified
+
+    async def stream(self, char_uuid: str, history: bool = False):
+        """Yield ``(timestamp, value)`` for each new sample as it arrives.
+
+        A consumer that falls more than a buffer behind skips the samples
+        it missed; they are counted in ``overruns``.
+        """
+        buffer = self.buffer(char_uuid)
+        changed = self._changed[char_uuid]
+        seq = buffer.oldest if history else buffer.count
+
+        while True:
+            if seq >= buffer.count:
+                # set() wakes every waiter, so clearing here loses nothing
+                changed.clear()
+                await changed.wait()
+                continue
+            if seq < buffer.oldest:
+                self.overruns += buffer.oldest - seq
+                seq = buffer.oldest
+
+            i = seq % buffer.capacity
+            timestamp, value = buffer.timestamps[i], buffer.values[i]
+            seq += 1
+            yield timestamp, value
+
+    def rate(self, char_uuid: str, window: float = 1.0) -> float:
+        return self.buffer(char_uuid).rate(window)
+
+    def summary(self, window: float = 10.0) -> str:
+        parts = []
+        for char_uuid, buffer in self.buffers.items():
+            name = characteristic_names.get(char_uuid, char_uuid)
+            parts.append(f"{name} {buffer.rate(window):.1f}/s")
+        return " | ".join(parts)
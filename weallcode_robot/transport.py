@@ -0,0 +1,69 @@
+import logging
+
+from bleak import BleakClient
+
+from .characteristics import CharacteristicRegistry
+from .utils import led_characteristic_uuid, motor_characteristic_uuid
+
+logger = logging.getLogger(__name__)
+
+# setpoint characteristics where only the latest value matters, so they can
+# be streamed without waiting for an acknowledgement on every write
+streamable_characteristics = (led_characteristic_uuid, motor_characteristic_uuid)
+
+
+class RobotTransport:
+    """Writes command payloads to a connected robot.
+
+    In streaming mode, LED and motor writes go out as write-without-response.
+    At most ``window`` of them are sent back to back; the next write is then
+    sent acknowledged, which only completes once everything queued before it
+    has gone over the link, and refills the window. Every other write is
+    always acknowledged, as is any payload longer than
+    ``max_unacknowledged`` bytes, which wouldn't fit in one packet.
+    """
+
+    def __init__(
+        self,
+        client: BleakClient,
+        characteristics: CharacteristicRegistry,
+        streaming: bool = False,
+        window: int = 8,
+    ):
+        self.client = client
+        self.characteristics = characteristics
+        self.streaming = streaming
+        self.window = max(1, window)
+        self._credits = self.window
+        self.max_unacknowledged = None
+
+        self._streamable = set()
+        for char_uuid in streamable_characteristics:
+            if char_uuid not in characteristics:
+                continue
+            if "write-without-response" in characteristics[char_uuid].properties:
+                self._streamable.add(char_uuid)
+
+        if streaming and not self._streamable:
+            logger.debug("streaming requested but no characteristic supports it")
+
+    async def write(self, char_uuid: str, payload: bytes) -> bool:
+        """Send a payload; returns whether the robot acknowledged it."""
+        char = self.characteristics[char_uuid]
+
+        if (
+            self.streaming
+            and self._credits > 0
+            and char_uuid in self._streamable
+            and (
+                self.max_unacknowledged is None
+                or len(payload) <= self.max_unacknowledged
+            )
+        ):
+            self._credits -= 1
+            await self.client.write_gatt_char(char, payload, response=False)
+            return False
+
+        await self.client.write_gatt_char(char, payload, response=True)
+        self._credits = self.window
+        return True
@@ -1,10 +1,38 @@
+import itertools
+import os
 import threading
-import queue
-import asyncio
-from enum import Enum
+from enum import Enum, IntEnum
+
+led_service_uuid = '1A230001-C2ED-4D11-AD1E-FC06D8A02D37'
+led_characteristic_uuid = '1A230002-C2ED-4D11-AD1E-FC06D8A02D37'
+
+motor_service_uuid = '1A240001-C2ED-4D11-AD1E-FC06D8A02D37'
+motor_characteristic_uuid = '1A240002-C2ED-4D11-AD1E-FC06D8A02D37'
+
+display_service_uuid = '1A250001-C2ED-4D11-AD1E-FC06D8A02D37'
+display_characteristic_uuid = '1A250002-C2ED-4D11-AD1E-FC06D8A02D37'
+
+buzzer_service_uuid = '1A260001-C2ED-4D11-AD1E-FC06D8A02D37'
+buzzer_characteristic_uuid = '1A260002-C2ED-4D11-AD1E-FC06D8A02D37'
 
 buttons_characteristic_uuid = '1A270002-C2ED-4D11-AD1E-FC06D8A02D37'
 
+characteristic_names = {
+    led_characteristic_uuid: 'led',
+    motor_characteristic_uuid: 'motor',
+    display_characteristic_uuid: 'display',
+    buzzer_characteristic_uuid: 'buzzer',
+    buttons_characteristic_uuid: 'buttons',
+}
+
+# (service, characteristic) pairs every robot must expose for commands to run
+command_characteristics = (
+    (led_service_uuid, led_characteristic_uuid),
+    (motor_service_uuid, motor_characteristic_uuid),
+    (display_service_uuid, display_characteristic_uuid),
+    (buzzer_service_uuid, buzzer_characteristic_uuid),
+)
+
 device_name_map = {
     "beep": "WAC-2463",
     "boop": "WAC-7F36",
@@ -56,6 +84,15 @@ device_name_map = {
     "zot": "",
 }
 
+def _env_flag(name: str) -> bool:
+    return os.environ.get(name, '').lower() in ('1', 'true', 'yes', 'on')
+
+def headless_requested() -> bool:
+    return _env_flag('WEALLCODE_HEADLESS')
+
+def debug_requested() -> bool:
+    return _env_flag('WEALLCODE_DEBUG')
+
 class DynamicObject:
     def __init__(self):
         pass
@@ -69,46 +106,75 @@ class RobotState(Enum):
     CONNECTED_IDLE = 2
     RUNNING = 3
     DONE = 4
+    FAILED = 5
+
+class DisconnectPolicy(Enum):
+    RESUME = 0  # carry on from the step that failed
+    RESTART = 1  # run the interrupted program again from the start
+    ABORT = 2  # fail the interrupted program
+
+class Priority(IntEnum):
+    EMERGENCY = 0  # stop the robot, cancelling everything else
+    EVENT = 1  # button and key handlers
+    PROGRAM = 2  # the main program
+
+class EventPolicy(Enum):
+    QUEUE = 0  # run pending events one after another
+    REPLACE = 1  # a new event cancels the running and pending ones
+    DROP = 2  # ignore events while one is running
+
+class _Items(list):
+    __slots__ = ("lock",)
+
+    def __init__(self, items=()):
+        super().__init__(items)
+        self.lock = threading.Lock()
+
+
+class PersistentQueue:
+    """An immutable FIFO queue; ``append`` and ``popleft`` return new queues.
+
+    All the versions made from one queue are views over one append-only
+    list, so keeping a version (a snapshot) costs nothing and popping from
+    it never consumes any other. Appending to the newest version extends
+    the list in place; appending to an older one, e.g. after restoring a
+    snapshot, first copies that version's items, once.
+    """
+
+    __slots__ = ("_items", "_start", "_stop")
+
+    def __init__(self, items=None, start: int = 0, stop: int = 0):
+        self._items = _Items() if items is None else items
+        self._start = start
+        self._stop = stop
+
+    def append(self, item) -> "PersistentQueue":
+        items, start, stop = self._items, self._start, self._stop
+        with items.lock:
+            if len(items) != stop:
+                # another version has appended past this one
+                items, start, stop = _Items(items[start:stop]), 0, stop - start
+            items.append(item)
+        return PersistentQueue(items, start, stop + 1)
+
+    def popleft(self):
+        """The first item and the queue without it."""
+        if self._start == self._stop:
+            raise IndexError("pop from an empty queue")
+        return (
+            self._items[self._start],
+            PersistentQueue(self._items, self._start + 1, self._stop),
+        )
+
+    def __len__(self) -> int:
+        return self._stop - self._start
+
+    # immutable, so copies can share it like a tuple
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
 
-def copy_queue(original_queue):
-    new_queue = queue.Queue(maxsize=original_queue.qsize())
-    temp_list = []
-
-    # Lock to ensure thread-safe access to the queue
-    with threading.Lock():
-        while not original_queue.empty():
-            try:
-                # Try to get an item without blocking
-                item = original_queue.get_nowait()
-                new_queue.put_nowait(item)
-                temp_list.append(item)
-            except queue.Empty:
-                # The queue is empty, break the loop
-                break
-
-    # Put items back into the original queue
-    for item in temp_list:
-        original_queue.put(item)
-
-    return new_queue
-
-async def copy_asyncio_queue(original_queue: asyncio.Queue) -> asyncio.Queue:
-    new_queue = asyncio.Queue(maxsize=original_queue.maxsize)
-    temp_list = []
-
-    # Transfer items from the original queue to the new queue
-    while not original_queue.empty():
-        item = await original_queue.get()
-        await new_queue.put(item)
-        temp_list.append(item)
-
-    # Restore items to the original queue
-    for item in temp_list:
-        await original_queue.put(item)
-
-    return new_queue
-
-async def empty_asyncio_queue(queue: asyncio.Queue):
-    while not queue.empty():
-        await queue.get()
-        queue.task_done()
+    def __iter__(self):
+        return itertools.islice(self._items, self._start, self._stop)